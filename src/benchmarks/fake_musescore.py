@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# Stand-in for the MuseScore binary, understanding only the command lines MuseScore (musescore_runner.py) issues:
+#   <in> -S <style.mss> -o <out.mscx>   copies the score, applying the style's Spatium
+#   <in.mscx> -o <out.pdf>              writes a PDF whose page count depends on measure count and spatium
+#   -j <job.json>                       writes the score PDF and one PDF per manual part
+# Page counts are controlled with FAKE_MUSESCORE_MEASURES_PER_PAGE (measures that fit on a page at the default spatium)
+# and render cost with FAKE_MUSESCORE_RENDER_SECONDS. This is run as a subprocess, so it can't import from the repo.
+import json
+import math
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+# For the repo's tests and benchmarks to point MuseScore.binary_path at.
+FAKE_MUSESCORE_PATH = os.path.abspath(__file__)
+
+_MUSESCORE_DEFAULT_SPATIUM = 1.76389
+
+
+def main(argv):
+    time.sleep(float(os.environ.get('FAKE_MUSESCORE_RENDER_SECONDS', '0')))
+
+    if argv[0] == '-j':
+        with open(argv[1]) as f:
+            jobs = json.load(f)
+        for job in jobs:
+            _run_job(job)
+        return
+
+    src_filepath = argv[0]
+    out_filepath = argv[argv.index('-o') + 1]
+    style_filepath = argv[argv.index('-S') + 1] if '-S' in argv else None
+    root = ET.parse(src_filepath).getroot()
+    if out_filepath.endswith('.mscx'):
+        _apply_style(root, style_filepath)
+        ET.ElementTree(root).write(out_filepath)
+    elif out_filepath.endswith('.pdf'):
+        _write_pdf(out_filepath, _get_num_pages(root))
+    else:
+        raise ValueError(f'Unsupported output {out_filepath}')
+
+
+def _run_job(job):
+    root = ET.parse(job['in']).getroot()
+    score_pdf_filepath, (part_prefix, part_suffix) = job['out']
+    num_pages = _get_num_pages(root)
+    _write_pdf(score_pdf_filepath, num_pages)
+    for part_name_node in root.findall('Score/Score/metaTag/[@name="partName"]'):
+        _write_pdf(f'{part_prefix}{part_name_node.text}{part_suffix}', num_pages)
+
+
+def _apply_style(root, style_filepath):
+    if style_filepath is None:
+        return
+
+    spatium_node = ET.parse(style_filepath).getroot().find('Style/Spatium')
+    if spatium_node is None:
+        return
+
+    score_style_node = root.find('Score/Style')
+    if score_style_node is None:
+        score_style_node = ET.SubElement(root.find('Score'), 'Style')
+    score_spatium_node = score_style_node.find('Spatium')
+    if score_spatium_node is None:
+        score_spatium_node = ET.SubElement(score_style_node, 'Spatium')
+    score_spatium_node.text = spatium_node.text
+
+
+# Measures per page scale with the area of each measure, i.e. with the square of the spatium.
+def _get_num_pages(root):
+    measures_per_default_page = float(os.environ.get('FAKE_MUSESCORE_MEASURES_PER_PAGE', '32'))
+    spatium_node = root.find('Score/Style/Spatium')
+    spatium = float(spatium_node.text) if spatium_node is not None else _MUSESCORE_DEFAULT_SPATIUM
+    num_measures = len(root.findall('Score/Staff/[@id="1"]/Measure'))
+    measures_per_page = measures_per_default_page * (_MUSESCORE_DEFAULT_SPATIUM / spatium) ** 2
+    return max(1, math.ceil(num_measures / measures_per_page))
+
+
+def _write_pdf(filepath, num_pages):
+    page_object_numbers = range(3, 3 + num_pages)
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(b'%d 0 R' % n for n in page_object_numbers),
+                                                      num_pages),
+    ]
+    objects.extend(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>' for _ in page_object_numbers)
+
+    content = b'%PDF-1.4\n'
+    offsets = []
+    for object_number, obj in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += b'%d 0 obj\n%s\nendobj\n' % (object_number, obj)
+
+    xref_offset = len(content)
+    content += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    content += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    content += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref_offset)
+
+    with open(filepath, 'wb') as f:
+        f.write(content)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
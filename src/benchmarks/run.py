@@ -0,0 +1,209 @@
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_musescore import FAKE_MUSESCORE_PATH
+from benchmarks.synthetic_scores import write_synthetic_mscz
+from musescore.musescore_runner import MuseScore
+from musescore.pdf_conversion import convert_mscz_to_pdfs, _convert_to_pdf_optimize_spatium
+from musescore.score import Score
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# (number of parts, number of measures)
+_SCORE_SIZES = [(1, 64), (4, 64), (4, 512), (16, 128), (16, 512)]
+# End to end conversion spawns two fake MuseScore processes per spatium probe per part, so it's limited to small scores.
+_MAX_END_TO_END_PARTS = 4
+# Cases faster than this are dominated by timer and scheduling noise, so they're never reported as regressions.
+_MIN_COMPARABLE_SECONDS = 0.01
+_DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'benchmark_results')
+
+
+def main():
+    args = _parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tempdir:
+        for num_parts, num_measures in _SCORE_SIZES:
+            mscz_filepath = os.path.join(tempdir, f'synthetic_{num_parts}x{num_measures}.mscz')
+            write_synthetic_mscz(mscz_filepath, num_parts, num_measures)
+
+            for case_name in _CASES:
+                if case_name in _END_TO_END_CASES and num_parts > _MAX_END_TO_END_PARTS:
+                    continue
+                result_name = f'{case_name}[{num_parts}x{num_measures}]'
+                results[result_name] = _run_case_in_subprocess(case_name, mscz_filepath, args.repeat)
+                _print_result(result_name, results[result_name])
+
+    run = {'commit': _get_git_commit(), 'time': datetime.datetime.now().isoformat(), 'repeat': args.repeat,
+           'results': results}
+    baseline_filepath = args.compare or _find_latest_results_file(args.results_dir)
+    os.makedirs(args.results_dir, exist_ok=True)
+    results_filepath = os.path.join(args.results_dir,
+                                    f'{datetime.datetime.now().strftime("%Y%m%d-%H%M%S")}-{run["commit"]}.json')
+    with open(results_filepath, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f'wrote {results_filepath}')
+
+    if baseline_filepath is None:
+        return
+    with open(baseline_filepath) as f:
+        baseline_run = json.load(f)
+    if _compare_and_print(baseline_run, run, args.threshold):
+        sys.exit(1)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark score splitting, spatium search and PDF conversion on '
+                                                 'synthetic scores, using a fake MuseScore binary.')
+    parser.add_argument('--repeat', help='Number of timed repetitions per case.', type=int, default=5)
+    parser.add_argument('--results-dir', help='Directory results are written to and compared from.', type=str,
+                        default=_DEFAULT_RESULTS_DIR)
+    parser.add_argument('--compare', help='Results file to compare against. Defaults to the latest in --results-dir.',
+                        type=str)
+    parser.add_argument('--threshold', help='Fractional slowdown of the fastest run reported as a regression.',
+                        type=float, default=0.2)
+    return parser.parse_args()
+
+
+# Every case runs in a fresh process so peak RSS is attributable to that case alone.
+def _run_case_in_subprocess(case_name, mscz_filepath, repeat):
+    context = multiprocessing.get_context('spawn')
+    result_queue = context.Queue()
+    process = context.Process(target=_run_case, args=(case_name, mscz_filepath, repeat, result_queue))
+    process.start()
+    result = result_queue.get()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f'Benchmark case {case_name} for {mscz_filepath} exited with {process.exitcode}')
+
+    return result
+
+
+def _run_case(case_name, mscz_filepath, repeat, result_queue):
+    MuseScore.binary_path = FAKE_MUSESCORE_PATH
+    durations = _CASES[case_name](mscz_filepath, repeat)
+    result_queue.put({'min_seconds': min(durations),
+                      'median_seconds': statistics.median(durations),
+                      'peak_rss_kb': _get_peak_rss_kb()})
+
+
+def _time_create_from_file(mscz_filepath, repeat):
+    return _time_repeated(lambda: Score.create_from_file(mscz_filepath), repeat)
+
+
+def _time_generate_part_scores(mscz_filepath, repeat):
+    score = Score.create_from_file(mscz_filepath)
+    return _time_repeated(score.generate_part_scores, repeat)
+
+
+def _time_get_mscx_as_string(mscz_filepath, repeat):
+    part_scores = Score.create_from_file(mscz_filepath).generate_part_scores()
+    return _time_repeated(lambda: [p.get_mscx_as_string() for p in part_scores], repeat)
+
+
+def _time_optimize_spatium(mscz_filepath, repeat):
+    part_score = Score.create_from_file(mscz_filepath).generate_part_scores()[0]
+    with tempfile.TemporaryDirectory() as tempdir:
+        out_filepath = os.path.join(tempdir, 'part.gen.pdf')
+        return _time_repeated(lambda: _convert_to_pdf_optimize_spatium(part_score, out_filepath), repeat)
+
+
+# Every repetition writes to its own directory, since the layout memo left by a previous one would skip the search.
+def _time_convert_mscz_to_pdfs(mscz_filepath, repeat):
+    with tempfile.TemporaryDirectory() as tempdir:
+        output_directories = iter([tempfile.mkdtemp(dir=tempdir) for _ in range(repeat)])
+        return _time_repeated(lambda: convert_mscz_to_pdfs(mscz_filepath, next(output_directories), 'synthetic'),
+                              repeat)
+
+
+# Re-converting an unchanged song, which renders each part once at the spatium from its layout memo.
+def _time_convert_mscz_to_pdfs_memo_hit(mscz_filepath, repeat):
+    with tempfile.TemporaryDirectory() as tempdir:
+        convert_mscz_to_pdfs(mscz_filepath, tempdir, 'synthetic')
+        return _time_repeated(lambda: convert_mscz_to_pdfs(mscz_filepath, tempdir, 'synthetic'), repeat)
+
+
+_CASES = {
+    'create_from_file': _time_create_from_file,
+    'generate_part_scores': _time_generate_part_scores,
+    'get_mscx_as_string': _time_get_mscx_as_string,
+    'optimize_spatium': _time_optimize_spatium,
+    'convert_mscz_to_pdfs': _time_convert_mscz_to_pdfs,
+    'convert_mscz_to_pdfs_memo_hit': _time_convert_mscz_to_pdfs_memo_hit,
+}
+_END_TO_END_CASES = {'convert_mscz_to_pdfs', 'convert_mscz_to_pdfs_memo_hit'}
+
+
+def _time_repeated(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return durations
+
+
+def _get_peak_rss_kb():
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes.
+    return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+
+def _get_git_commit():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+        is_dirty = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], text=True) != ''
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+    return f'{commit}-dirty' if is_dirty else commit
+
+
+def _find_latest_results_file(results_dir):
+    if not os.path.isdir(results_dir):
+        return None
+
+    results_filenames = sorted(f for f in os.listdir(results_dir) if f.endswith('.json'))
+    return os.path.join(results_dir, results_filenames[-1]) if len(results_filenames) > 0 else None
+
+
+def _print_result(result_name, result):
+    print(f'{result_name:<45} min {result["min_seconds"]:.4f}s median {result["median_seconds"]:.4f}s '
+          f'peak rss {result["peak_rss_kb"]} kB')
+
+
+# Returns whether any case regressed by more than threshold.
+def _compare_and_print(baseline_run, run, threshold):
+    print(f'comparing against {baseline_run["commit"]} from {baseline_run["time"]}')
+    found_regression = False
+    for result_name, result in run['results'].items():
+        baseline_result = baseline_run['results'].get(result_name)
+        if baseline_result is None:
+            continue
+
+        ratio = result['min_seconds'] / baseline_result['min_seconds']
+        is_regression = ratio > 1 + threshold and result['min_seconds'] >= _MIN_COMPARABLE_SECONDS
+        found_regression = found_regression or is_regression
+        print(f'{result_name:<45} {baseline_result["min_seconds"]:.4f}s -> {result["min_seconds"]:.4f}s '
+              f'({ratio:.2f}x){" REGRESSION" if is_regression else ""}')
+
+    return found_regression
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import xml.etree.ElementTree as ET
+import zipfile
+
+from utils.xml_utils import create_node_with_text
+
+_MUSESCORE_DEFAULT_SPATIUM = '1.76389'
+_REHEARSAL_MARK_INTERVAL = 8
+
+
+# Produces the smallest score structure that Score and _PartScore rely on: one single-staff Part per instrument, a title
+# VBox on staff 1, and global text (tempo, rehearsal marks) on staff 1 so part splitting has something to copy around.
+def create_synthetic_mscx(num_parts, num_measures):
+    root = ET.Element('museScore', version='3.01')
+    score_node = ET.SubElement(root, 'Score')
+
+    style_node = ET.SubElement(score_node, 'Style')
+    style_node.append(create_node_with_text('Spatium', _MUSESCORE_DEFAULT_SPATIUM))
+    score_node.append(_create_meta_tag('workTitle', f'Synthetic {num_parts}x{num_measures}'))
+
+    for part_index in range(num_parts):
+        part_node = ET.SubElement(score_node, 'Part')
+        ET.SubElement(part_node, 'Staff', id=str(part_index + 1))
+        instrument_node = ET.SubElement(part_node, 'Instrument')
+        # Every other instrument shares a name so the duplicate part renaming path gets exercised too.
+        instrument_node.append(create_node_with_text('longName', f'Instrument {part_index // 2}'))
+
+    for part_index in range(num_parts):
+        staff_node = ET.SubElement(score_node, 'Staff', id=str(part_index + 1))
+        if part_index == 0:
+            staff_node.append(_create_title_vbox(f'Synthetic {num_parts}x{num_measures}'))
+        for measure_index in range(num_measures):
+            staff_node.append(_create_measure(measure_index, is_first_staff=part_index == 0))
+
+    return ET.tostring(root)
+
+
+def write_synthetic_mscz(filepath, num_parts, num_measures):
+    with zipfile.ZipFile(filepath, 'w', compression=zipfile.ZIP_DEFLATED) as mscz:
+        mscz.writestr('synthetic.mscx', create_synthetic_mscx(num_parts, num_measures))
+
+
+def _create_meta_tag(name, text):
+    meta_tag_node = create_node_with_text('metaTag', text)
+    meta_tag_node.set('name', name)
+    return meta_tag_node
+
+
+def _create_title_vbox(title):
+    vbox_node = ET.Element('VBox')
+    vbox_node.append(create_node_with_text('height', '10'))
+    text_node = ET.SubElement(vbox_node, 'Text')
+    text_node.extend([create_node_with_text('style', 'Title'), create_node_with_text('text', title)])
+    return vbox_node
+
+
+def _create_measure(measure_index, is_first_staff):
+    measure_node = ET.Element('Measure')
+    voice_node = ET.SubElement(measure_node, 'voice')
+    if measure_index == 0:
+        time_sig_node = ET.SubElement(voice_node, 'TimeSig')
+        time_sig_node.extend([create_node_with_text('sigN', '4'), create_node_with_text('sigD', '4')])
+
+    if is_first_staff and measure_index == 0:
+        tempo_node = ET.SubElement(voice_node, 'Tempo')
+        tempo_node.extend([create_node_with_text('tempo', '2'), create_node_with_text('text', 'Allegro')])
+    if is_first_staff and measure_index % _REHEARSAL_MARK_INTERVAL == 0:
+        rehearsal_mark_node = ET.SubElement(voice_node, 'RehearsalMark')
+        rehearsal_mark_node.append(create_node_with_text('text', str(measure_index // _REHEARSAL_MARK_INTERVAL)))
+
+    for _ in range(4):
+        chord_node = ET.SubElement(voice_node, 'Chord')
+        chord_node.append(create_node_with_text('durationType', 'quarter'))
+        note_node = ET.SubElement(chord_node, 'Note')
+        note_node.extend([create_node_with_text('pitch', str(60 + measure_index % 12)),
+                          create_node_with_text('tpc', '14')])
+
+    return measure_node
@@ -1,13 +1,25 @@
 import contextlib
 from dataclasses import dataclass
 import datetime
+import hashlib
+import json
 import os
 import tempfile
+import threading
+import time
 
-from googleapiclient.discovery import build
+from googleapiclient.discovery import DISCOVERY_URI, build_from_document
 from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+import requests
 
-from drive.google_auth import get_credentials
+from utils.instrumentation import increment_counter, timed_span
+
+# build() fetches and parses the discovery document every time it's called, which is once per thread here. Instead the
+# document is cached on disk (next to token.pickle) and parsed once per process.
+_DISCOVERY_CACHE_FILENAME = 'drive_v3_discovery.json'
+_DISCOVERY_CACHE_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+_discovery_document = None
+_discovery_document_lock = threading.Lock()
 
 
 class Drive:
@@ -16,25 +28,24 @@ class Drive:
         self._changes_page_token = None
 
     def get_file_metadata(self, file_id):
-        response = self._service.files().get(
+        response = _execute('files.get', self._service.files().get(
             fileId=file_id,
             fields='id, name, mimeType, parents, modifiedTime'
-        ).execute()
+        ))
         return DriveFile.create_from_drive_api_response(response)
 
     @contextlib.contextmanager
     def open_as_temporary_named_file(self, file_id, suffix=None):
         f = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
-        downloader = MediaIoBaseDownload(f, self._service.files().get_media(fileId=file_id))
-
-        download_complete = False
-        while not download_complete:
-            _, download_complete = downloader.next_chunk()
-
+        self._download_to_file_object(file_id, f)
         f.close()
         yield f.name
         os.remove(f.name)
 
+    def download_file(self, file_id, filename):
+        with open(filename, 'wb') as f:
+            self._download_to_file_object(file_id, f)
+
     def recursively_search_directory(self, directory_id):
         dir_drive_files = self.list_directory(directory_id)
 
@@ -49,28 +60,44 @@ class Drive:
 
         return files
 
-    # Drive allows multiple files to have the same name, if one exists we just update it.
-    def upload_or_update_file(self, filename, parent_directory_id):
+    # Drive allows multiple files to have the same name, if one exists we just update it. source_modified_datetime is
+    # the modified time of the file this one was generated from, see the unchanged content case below.
+    def upload_or_update_file(self, filename, parent_directory_id, source_modified_datetime):
         file_basename = os.path.basename(filename)
-        file_id = self._find_matching_file_in_dir(file_basename, parent_directory_id)
-
-        file_metadata = {'name': file_basename}
-        media_body = MediaFileUpload(filename)
-        file_service = self._service.files()
-        if file_id is None:
-            file_metadata['parents'] = [parent_directory_id]
-            file_id = file_service.create(body=file_metadata, media_body=media_body).execute()['id']
-        else:
-            # there's a newRevision boolean param as well, for now not set but maybe worth considering.
-            file_service.update(fileId=file_id, body=file_metadata, media_body=media_body).execute()
+        file_size = os.path.getsize(filename)
+        with timed_span('upload', filename=file_basename, size=file_size):
+            matching_drive_file = self._find_matching_file_in_dir(file_basename, parent_directory_id)
+
+            file_metadata = {'name': file_basename}
+            file_service = self._service.files()
+            if matching_drive_file is None:
+                file_metadata['parents'] = [parent_directory_id]
+                file_id = _execute('files.create', file_service.create(body=file_metadata,
+                                                                       media_body=MediaFileUpload(filename)))['id']
+            elif matching_drive_file.md5_checksum == _get_md5_checksum(filename):
+                # Callers compare modified times to decide whether PDFs are up to date, so the file still needs to look
+                # newer than its source even though its content is the same. Both times come from Drive's clock this
+                # way, where a local timestamp could be behind it and leave the file looking outdated forever.
+                file_id = matching_drive_file.id
+                file_metadata['modifiedTime'] = _format_rfc3339_datetime(
+                    source_modified_datetime + datetime.timedelta(milliseconds=1))
+                _execute('files.update', file_service.update(fileId=file_id, body=file_metadata))
+                increment_counter('upload_skipped_bytes', amount=file_size)
+                print(f'{file_basename} unchanged, skipped upload')
+            else:
+                file_id = matching_drive_file.id
+                # there's a newRevision boolean param as well, for now not set but maybe worth considering.
+                _execute('files.update', file_service.update(fileId=file_id, body=file_metadata,
+                                                             media_body=MediaFileUpload(filename)))
 
         return file_id
 
     def list_directory(self, directory_id):
-        dir_items = self._service.files().list(
+        dir_items = _execute('files.list', self._service.files().list(
             q=f'parents in "{directory_id}" and trashed = false',
-            fields='incompleteSearch, files/id, files/name, files/mimeType, files/parents, files/modifiedTime'
-        ).execute()
+            fields='incompleteSearch, files/id, files/name, files/mimeType, files/parents, files/modifiedTime, '
+                   'files/md5Checksum'
+        ))
         if dir_items['incompleteSearch']:
             raise ValueError(f'Incomplete search for {directory_id}, not yet handled')
 
@@ -78,16 +105,17 @@ class Drive:
 
     def get_changes(self):
         if self._changes_page_token is None:
-            self._changes_page_token = self._service.changes().getStartPageToken().execute()['startPageToken']
+            self._changes_page_token = _execute(
+                'changes.getStartPageToken', self._service.changes().getStartPageToken())['startPageToken']
 
         changes = []
         found_new_start_page_token = False
         while not found_new_start_page_token:
-            response = self._service.changes().list(
+            response = _execute('changes.list', self._service.changes().list(
                 pageToken=self._changes_page_token,
                 fields='newStartPageToken, nextPageToken, changes/removed, changes/file/id',
                 spaces='drive'
-            ).execute()
+            ))
 
             print(f'queried changes with token {self._changes_page_token}, {len(response["changes"])} results')
             for change in response['changes']:
@@ -102,24 +130,83 @@ class Drive:
         return changes
 
     def move_file_to_trash(self, file_id):
-        self._service.files().update(fileId=file_id, body={'trashed': True}).execute()
+        with timed_span('trash', file_id=file_id):
+            _execute('files.update', self._service.files().update(fileId=file_id, body={'trashed': True}))
 
+    # The underlying http client isn't thread safe, so each thread needs its own Drive (credentials can be shared).
     @classmethod
-    def create_authenticate_and_start(cls):
-        return cls(build('drive', 'v3', credentials=get_credentials()))
+    def create_from_credentials(cls, credentials):
+        return cls(build_from_document(_get_discovery_document(), credentials=credentials))
+
+    def _download_to_file_object(self, file_id, f):
+        downloader = MediaIoBaseDownload(f, self._service.files().get_media(fileId=file_id))
+        with timed_span('download', file_id=file_id):
+            download_complete = False
+            while not download_complete:
+                increment_counter('drive_api_calls', method='files.get_media')
+                _, download_complete = downloader.next_chunk()
 
     def _find_matching_file_in_dir(self, file_basename, parent_directory_id):
         dir_drive_files = self.list_directory(parent_directory_id)
-        matching_file_id = None
+        matching_drive_file = None
         for drive_file in dir_drive_files:
             if drive_file.is_folder() or drive_file.name != file_basename:
                 continue
-            if matching_file_id is not None:
+            if matching_drive_file is not None:
                 raise ValueError(f'Found multiple matches for {file_basename} in directory {parent_directory_id}')
 
-            matching_file_id = drive_file.id
+            matching_drive_file = drive_file
+
+        return matching_drive_file
+
+
+def _get_md5_checksum(filename):
+    md5 = hashlib.md5()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            md5.update(chunk)
+
+    return md5.hexdigest()
+
+
+def _get_discovery_document():
+    global _discovery_document  # pylint: disable=global-statement
+    with _discovery_document_lock:
+        if _discovery_document is None:
+            is_cache_stale = not os.path.exists(_DISCOVERY_CACHE_FILENAME) or \
+                os.path.getmtime(_DISCOVERY_CACHE_FILENAME) < time.time() - _DISCOVERY_CACHE_MAX_AGE_SECONDS
+            if is_cache_stale:
+                try:
+                    _download_discovery_document(_DISCOVERY_CACHE_FILENAME)
+                except (requests.RequestException, OSError) as e:
+                    # The API rarely changes, so an outdated document is better than not starting at all.
+                    if not os.path.exists(_DISCOVERY_CACHE_FILENAME):
+                        raise
+                    print(f'failed to refresh {_DISCOVERY_CACHE_FILENAME}, using the cached one: {e}')
+            with open(_DISCOVERY_CACHE_FILENAME) as f:
+                _discovery_document = json.load(f)
+
+        return _discovery_document
+
+
+def _download_discovery_document(filename):
+    with timed_span('discovery_download'):
+        response = requests.get(DISCOVERY_URI.format(api='drive', apiVersion='v3'))
+        response.raise_for_status()
+
+    # Written to a temporary name first so an interrupted write never leaves a truncated cache behind.
+    with open(f'{filename}.tmp', 'w') as f:
+        f.write(response.text)
+    os.replace(f'{filename}.tmp', filename)
+
+
+def _format_rfc3339_datetime(naive_utc_datetime):
+    return naive_utc_datetime.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
 
-        return matching_file_id
+def _execute(method, request):
+    increment_counter('drive_api_calls', method=method)
+    return request.execute()
 
 
 @dataclass
@@ -129,6 +216,8 @@ class DriveFile:
     mime_type: str
     parents: list
     modified_datetime: datetime.datetime
+    # Only binary files stored in Drive have a checksum (e.g. not folders or Google Docs), and only when it's requested.
+    md5_checksum: str = None
 
     def is_folder(self):
         return self.mime_type == 'application/vnd.google-apps.folder'
@@ -142,7 +231,8 @@ class DriveFile:
                    name=response['name'],
                    mime_type=response['mimeType'],
                    parents=response['parents'],
-                   modified_datetime=modified_datetime)
+                   modified_datetime=modified_datetime,
+                   md5_checksum=response.get('md5Checksum'))
 
 
 @dataclass
@@ -1,11 +1,16 @@
+import datetime
 import os
 import pickle
+import threading
+import time
 
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 
 _SCOPES = ['https://www.googleapis.com/auth/drive']
 _TOKEN_FILENAME = 'token.pickle'
+_REFRESH_BEFORE_EXPIRY = datetime.timedelta(minutes=5)
+_REFRESH_RETRY_SECONDS = 60
 
 
 def get_credentials():
@@ -23,11 +28,38 @@ def get_credentials():
     return credentials
 
 
+# Keeps credentials refreshed from a daemon thread shortly before they expire, so API calls (and the worker threads
+# sharing these credentials) don't stall on a synchronous token refresh.
+def start_background_refresh(credentials):
+    if credentials.refresh_token is None:
+        return
+
+    threading.Thread(target=_refresh_before_expiry, args=(credentials,), daemon=True).start()
+
+
+def _refresh_before_expiry(credentials):
+    while True:
+        # expiry is a naive UTC datetime, None if the token doesn't expire.
+        if credentials.expiry is None:
+            return
+        time.sleep(max(0.0, (credentials.expiry - _REFRESH_BEFORE_EXPIRY - datetime.datetime.utcnow()).total_seconds()))
+
+        try:
+            credentials.refresh(Request())
+            _dump_token_file(credentials, _TOKEN_FILENAME)
+        except Exception as e:  # pylint: disable=broad-except
+            print(f'background credential refresh failed, retrying in {_REFRESH_RETRY_SECONDS}s: {e}')
+            time.sleep(_REFRESH_RETRY_SECONDS)
+
+
 def _load_token_file(filename):
     with open(filename, 'rb') as token:
         return pickle.load(token)
 
 
+# Written to a temporary name first, since the background refresh can be killed mid-write along with the process, which
+# would otherwise leave a truncated token behind.
 def _dump_token_file(credentials, filename):
-    with open(filename, 'wb') as token:
+    with open(f'{filename}.tmp', 'wb') as token:
         pickle.dump(credentials, token)
+    os.replace(f'{filename}.tmp', filename)
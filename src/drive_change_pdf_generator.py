@@ -1,43 +1,92 @@
+from dataclasses import dataclass
 import os
 import tempfile
 import time
 
 from drive.drive import Drive
-from musescore.pdf_conversion import convert_mscz_to_pdfs
+from drive.google_auth import get_credentials, start_background_refresh
+from musescore.musescore_runner import MuseScore
+from musescore.pdf_conversion import convert_mscz_to_pdfs, get_layout_memo_filename
+from utils.fair_share_scheduler import FairShareScheduler
+from utils.instrumentation import record_value, timed_span
+from utils.job_queue import JobQueue, PRIORITY_BULK, PRIORITY_CHANGED
 from utils.os_path_utils import get_no_extension, get_extension
 
 
-def run_drive_change_pdf_generator(drive_root_folder_id):
-    d = Drive.create_authenticate_and_start()
-
-    listening_file_ids = _refresh_listening_file_id_index_and_regen(d, drive_root_folder_id)
+@dataclass
+class DriveRoot:
+    folder_id: str
+    priority: float = 1
+
+
+# Up to max_concurrent_files files are worked on at once, sharing max_concurrent_renders MuseScore processes. Having
+# more files than renders in flight lets the extra files download (and upload) while the others hold MuseScore. Both
+# the files and the MuseScore processes are shared between roots by priority.
+def run_drive_change_pdf_generator(drive_roots, max_concurrent_renders=1, max_concurrent_files=None,
+                                   job_queue_filename='job_queue.sqlite3', startup_start_time=None):
+    if max_concurrent_files is None:
+        max_concurrent_files = max_concurrent_renders + 1
+
+    credentials = get_credentials()
+    start_background_refresh(credentials)
+    d = Drive.create_from_credentials(credentials)
+
+    # Jobs queued or running when the process last stopped are picked back up from here.
+    job_queue = JobQueue(job_queue_filename)
+    for dead_job in job_queue.get_dead_jobs():
+        print(f'dead-letter job {dead_job.job_key} failed {dead_job.attempts} times, '
+              f'last error:\n{dead_job.last_error}')
+
+    scheduler = FairShareScheduler(max_concurrent_files,
+                                   lambda: Drive.create_from_credentials(credentials),
+                                   _generate_pdfs_for_file_id_if_needed,
+                                   job_queue)
+    for drive_root in drive_roots:
+        scheduler.add_root(drive_root.folder_id, drive_root.priority)
+    MuseScore.set_process_slots(scheduler.create_slots(max_concurrent_renders))
+    scheduler.start()
+    if startup_start_time is not None:
+        startup_seconds = time.perf_counter() - startup_start_time
+        print(f'drive mode started in {startup_seconds:.2f}s')
+        record_value('startup_seconds', startup_seconds, mode='drive')
+
+    listening_file_id_to_root_id = _refresh_listening_file_id_index_and_regen(d, scheduler, drive_roots)
     counter = 1
     while True:
         if counter % 10 == 0:
-            listening_file_ids = _refresh_listening_file_id_index_and_regen(d, drive_root_folder_id)
+            listening_file_id_to_root_id = _refresh_listening_file_id_index_and_regen(d, scheduler, drive_roots)
 
         for c in d.get_changes():
-            if c.id not in listening_file_ids:
+            if c.id not in listening_file_id_to_root_id:
                 continue
             if c.removed:
-                listening_file_ids.remove(c.id)
+                del listening_file_id_to_root_id[c.id]
                 continue
 
             # You can save an API query by caching the results of the change and using it here, but this makes the code
             # (a tiny bit) easier to write.
-            _generate_pdfs_for_file_id_if_needed(d, c.id)
+            scheduler.submit(listening_file_id_to_root_id[c.id], c.id, PRIORITY_CHANGED)
 
         counter += 1
         time.sleep(5)
 
 
-def _refresh_listening_file_id_index_and_regen(drive, root):
-    listening_file_ids = {f.id for f in drive.recursively_search_directory(root)
-                          if _is_processable_musescore_file(f)}
-    for file_id in listening_file_ids:
-        _generate_pdfs_for_file_id_if_needed(drive, file_id)
+# A file under several (nested) roots is attributed to the highest priority one. Files that have been moved to the
+# dead-letter list stay there until they change again.
+def _refresh_listening_file_id_index_and_regen(drive, scheduler, drive_roots):
+    listening_file_id_to_root_id = {}
+    for drive_root in sorted(drive_roots, key=lambda r: r.priority, reverse=True):
+        for f in drive.recursively_search_directory(drive_root.folder_id):
+            try:
+                if _is_processable_musescore_file(f):
+                    listening_file_id_to_root_id.setdefault(f.id, drive_root.folder_id)
+            except ValueError as e:
+                print(f'skipping: {e}')
+
+    for file_id, root_id in listening_file_id_to_root_id.items():
+        scheduler.submit(root_id, file_id, PRIORITY_BULK, revive_dead=False)
 
-    return listening_file_ids
+    return listening_file_id_to_root_id
 
 
 # TODO: this doesn't take into account if pdfs are missing but the mscz file hasn't changed
@@ -45,8 +94,9 @@ def _generate_pdfs_for_file_id_if_needed(drive, file_id):
     drive_file = drive.get_file_metadata(file_id)
     assert _is_processable_musescore_file(drive_file)
 
-    gen_pdf_drive_files = [item for item in drive.list_directory(drive_file.parents[0])
-                           if item.name.endswith('.gen.pdf')]
+    song_name = get_no_extension(drive_file.name)
+    dir_drive_files = drive.list_directory(drive_file.parents[0])
+    gen_pdf_drive_files = [item for item in dir_drive_files if item.name.endswith('.gen.pdf')]
     if len(gen_pdf_drive_files) > 0 and \
             drive_file.modified_datetime < min([f.modified_datetime for f in gen_pdf_drive_files]):
         print(f'pdfs up to date for {drive_file.name}')
@@ -54,13 +104,16 @@ def _generate_pdfs_for_file_id_if_needed(drive, file_id):
 
     print(f'need to update pdfs for {drive_file.name}')
 
+    layout_memo_drive_files = [item for item in dir_drive_files if item.name == get_layout_memo_filename(song_name)]
     untouched_gen_pdf_ids = {f.id for f in gen_pdf_drive_files}
     with drive.open_as_temporary_named_file(drive_file.id, suffix=get_extension(drive_file.name)) as musescore_file:
         gen_pdf_ids = _convert_opened_drive_file_to_pdf_and_upload(
             drive,
             musescore_file,
-            song_name=get_no_extension(drive_file.name),
-            upload_dir=drive_file.parents[0])
+            song_name=song_name,
+            upload_dir=drive_file.parents[0],
+            musescore_modified_datetime=drive_file.modified_datetime,
+            layout_memo_drive_file=layout_memo_drive_files[0] if len(layout_memo_drive_files) > 0 else None)
         print(gen_pdf_ids)
         for gen_pdf_id in gen_pdf_ids:
             if gen_pdf_id in untouched_gen_pdf_ids:
@@ -71,10 +124,15 @@ def _generate_pdfs_for_file_id_if_needed(drive, file_id):
         drive.move_file_to_trash(trash_id)
 
 
-def _convert_opened_drive_file_to_pdf_and_upload(drive, musescore_file, song_name, upload_dir):
+# The layout memo is uploaded along with the PDFs, and downloaded again here so the next conversion can reuse it.
+def _convert_opened_drive_file_to_pdf_and_upload(drive, musescore_file, song_name, upload_dir,
+                                                 musescore_modified_datetime, layout_memo_drive_file):
     with tempfile.TemporaryDirectory() as tempdir:
-        convert_mscz_to_pdfs(musescore_file, tempdir, song_name)
-        return [drive.upload_or_update_file(os.path.join(tempdir, gen_file), upload_dir)
+        if layout_memo_drive_file is not None:
+            drive.download_file(layout_memo_drive_file.id, os.path.join(tempdir, layout_memo_drive_file.name))
+        with timed_span('convert', song_name=song_name):
+            convert_mscz_to_pdfs(musescore_file, tempdir, song_name)
+        return [drive.upload_or_update_file(os.path.join(tempdir, gen_file), upload_dir, musescore_modified_datetime)
                 for gen_file in os.listdir(tempdir)]
 
 
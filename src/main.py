@@ -1,11 +1,19 @@
+import time
+
+# Taken before the other imports, which are a good part of startup time. Interpreter startup itself isn't included.
+_STARTUP_START_TIME = time.perf_counter()
+
+# pylint: disable=wrong-import-position
 import argparse
 import json
 import os
 
-from drive_change_pdf_generator import run_drive_change_pdf_generator
 from musescore.musescore_runner import MuseScore
 from musescore.pdf_conversion import convert_mscz_to_pdfs
+from tree_conversion import run_tree_conversion
+from utils.instrumentation import record_value, set_jsonl_output, start_prometheus_server
 from utils.os_path_utils import get_no_extension
+# pylint: enable=wrong-import-position
 
 
 def main():
@@ -17,15 +25,45 @@ def main():
     MuseScore.binary_path = config_dict['musescore_binary']
     MuseScore.validate_binary()
 
+    if args.metrics_jsonl is not None:
+        set_jsonl_output(args.metrics_jsonl)
+    if args.metrics_port is not None:
+        start_prometheus_server(args.metrics_port)
+
     if args.mscz_to_convert is not None:
         song_dir, song_basename = os.path.split(args.mscz_to_convert)
+        startup_seconds = time.perf_counter() - _STARTUP_START_TIME
+        print(f'convert mode started in {startup_seconds:.2f}s')
+        record_value('startup_seconds', startup_seconds, mode='convert')
         convert_mscz_to_pdfs(
             mscz_filename=args.mscz_to_convert,
             output_directory=song_dir,
             song_name=get_no_extension(song_basename))
         return
 
-    run_drive_change_pdf_generator(config_dict['drive_folder_id'])
+    if args.convert_tree is not None:
+        run_tree_conversion(args.convert_tree, args.jobs)
+        return
+
+    _run_drive_mode(config_dict)
+
+
+# The Google API client libraries take a good chunk of startup time to import, so they're only imported in Drive mode.
+def _run_drive_mode(config_dict):
+    # pylint: disable=import-outside-toplevel
+    from drive_change_pdf_generator import DriveRoot, run_drive_change_pdf_generator
+
+    # Either a single "drive_folder_id", or a list of "drive_folders" entries with an "id" and an optional "priority".
+    if 'drive_folders' in config_dict:
+        drive_roots = [DriveRoot(folder['id'], folder.get('priority', 1)) for folder in config_dict['drive_folders']]
+    else:
+        drive_roots = [DriveRoot(config_dict['drive_folder_id'])]
+
+    run_drive_change_pdf_generator(drive_roots,
+                                   max_concurrent_renders=config_dict.get('max_concurrent_renders', 1),
+                                   max_concurrent_files=config_dict.get('max_concurrent_files'),
+                                   job_queue_filename=config_dict.get('job_queue_file', 'job_queue.sqlite3'),
+                                   startup_start_time=_STARTUP_START_TIME)
 
 
 def _parse_args():
@@ -37,6 +75,14 @@ def _parse_args():
                         type=str, default=_DEFAULT_CONFIG_FILENAME)
     parser.add_argument('--mscz-to-convert', help='Convert an mscz file on the local filesystem instead of drive.',
                         type=str)
+    parser.add_argument('--convert-tree', help='Convert every mscz/ mscx file below a local directory, skipping files '
+                                               'whose PDFs are newer and resuming from the last interrupted run.',
+                        type=str)
+    parser.add_argument('--jobs', help='Number of processes for --convert-tree. Defaults to the number of CPUs.',
+                        type=int, default=os.cpu_count())
+    parser.add_argument('--metrics-jsonl', help='Append timing spans and recorded values to this JSON lines file.',
+                        type=str)
+    parser.add_argument('--metrics-port', help='Serve Prometheus text metrics on this localhost port.', type=int)
 
     return parser.parse_args()
 
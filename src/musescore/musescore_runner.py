@@ -1,16 +1,24 @@
+import contextlib
 import json
 import subprocess
 import os
 import xml.etree.ElementTree as ET
 
+from utils.instrumentation import increment_counter, timed_span
 from utils.os_path_utils import get_extension
+from utils.pdf_utils import normalize_pdf_dates
 from utils.tempfile_utils import scoped_named_temporary_file
 from utils.xml_utils import create_node_with_text
 
+_GENERATED_PDF_SUFFIX = '.gen.pdf'
+
 
 # https://musescore.org/en/handbook/command-line-options
 class MuseScore:
     binary_path = None
+    # Limits how many MuseScore processes run at once across all threads, anything with acquire() and release() (e.g. a
+    # threading.BoundedSemaphore). None means no limit.
+    _process_slots = None
 
     @staticmethod
     def validate_binary():
@@ -21,17 +29,40 @@ class MuseScore:
         if not os.path.isfile(MuseScore.binary_path):
             raise RuntimeError(f'Non-existent MuseScore binary path {MuseScore.binary_path}')
 
-    # TODO: ideally, filename generation is done in one central place (maybe even still in this class).
     @staticmethod
-    def convert_mscz_to_pdf_with_manual_parts(song_name, mscz_filepath, out_dir):
-        pdf_path_prefix = os.path.join(out_dir, song_name)
+    def set_process_slots(process_slots):
+        MuseScore._process_slots = process_slots
+
+    @staticmethod
+    def get_score_pdf_filename(song_name):
+        return f'{song_name}{_GENERATED_PDF_SUFFIX}'
+
+    @staticmethod
+    def get_part_pdf_filename(song_name, part_name):
+        return f'{song_name} - {part_name}{_GENERATED_PDF_SUFFIX}'
+
+    # part_names must be the score's manual part names (see Score.get_part_names), which MuseScore names the part PDFs
+    # after. Returns the paths of the PDFs written.
+    @staticmethod
+    def convert_mscz_to_pdf_with_manual_parts(song_name, mscz_filepath, out_dir, part_names):
+        score_pdf_filepath = os.path.join(out_dir, MuseScore.get_score_pdf_filename(song_name))
+        # MuseScore puts each part name between this prefix and suffix, the same as get_part_pdf_filename.
         musescore_job_params = [{
             'in': mscz_filepath,
-            'out': [f'{pdf_path_prefix}.gen.pdf', [f'{pdf_path_prefix} - ', '.gen.pdf']]
+            'out': [score_pdf_filepath, [os.path.join(out_dir, f'{song_name} - '), _GENERATED_PDF_SUFFIX]]
         }]
 
+        increment_counter('musescore_renders')
         with scoped_named_temporary_file(content=json.dumps(musescore_job_params), suffix='.json') as job_json_filepath:
-            subprocess.check_call([MuseScore.binary_path, '-j', job_json_filepath])
+            MuseScore._run(['-j', job_json_filepath])
+
+        # Only this song's own outputs, since other songs' PDFs can share out_dir (and be mid-conversion).
+        pdf_filepaths = [score_pdf_filepath] + \
+            [os.path.join(out_dir, MuseScore.get_part_pdf_filename(song_name, p)) for p in part_names]
+        for pdf_filepath in pdf_filepaths:
+            normalize_pdf_dates(pdf_filepath)
+
+        return pdf_filepaths
 
     @staticmethod
     def convert_to_pdf(src_filepath, out_filename, spatium=None):
@@ -44,12 +75,36 @@ class MuseScore:
         # well where it'd just shrink the notes and not adjust staff position).
         # TODO: On occasion Windows decides to throw a "[WinError 5] Access is denied" error, I'm not too sure why,
         #       seeing as it typically runs fine. Maybe there's some process call restrictions?
+        increment_counter('musescore_renders')
         style_file_text = MuseScore._create_style_file_text(spatium)
         with scoped_named_temporary_file(content=style_file_text, suffix='.mss') as style_filepath:
             with scoped_named_temporary_file(content='', suffix='.mscx') as mscx_with_styles:
-                subprocess.check_call([MuseScore.binary_path, src_filepath, '-S', style_filepath, '-o',
-                                       mscx_with_styles])
-                subprocess.check_call([MuseScore.binary_path, mscx_with_styles, '-o', out_filename])
+                MuseScore._run([src_filepath, '-S', style_filepath, '-o', mscx_with_styles], spatium=spatium)
+                MuseScore._run([mscx_with_styles, '-o', out_filename], spatium=spatium)
+
+        # Keeps re-renders of unchanged scores byte identical, so uploads of them can be skipped.
+        normalize_pdf_dates(out_filename)
+
+    @staticmethod
+    def _run(args, **span_attributes):
+        with MuseScore._acquire_process_slot():
+            with timed_span('musescore', args=args, **span_attributes):
+                subprocess.check_call([MuseScore.binary_path] + args)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _acquire_process_slot():
+        process_slots = MuseScore._process_slots
+        if process_slots is None:
+            yield
+            return
+
+        with timed_span('musescore_slot_wait'):
+            process_slots.acquire()
+        try:
+            yield
+        finally:
+            process_slots.release()
 
     @staticmethod
     def _create_style_file_text(spatium):
@@ -1,14 +1,17 @@
+import json
 import os
 
-from PyPDF2 import PdfFileReader
-
 from musescore.musescore_runner import MuseScore
 from musescore.score import Score
+from utils.instrumentation import record_value, timed_span
 from utils.tempfile_utils import scoped_named_temporary_file
 
+_LAYOUT_MEMO_VERSION = 1
+
 
 def convert_mscz_to_pdfs(mscz_filename, output_directory, song_name):
-    score = Score.create_from_file(mscz_filename)
+    with timed_span('parse', filename=mscz_filename):
+        score = Score.create_from_file(mscz_filename)
     if score.has_manual_parts():
         _convert_with_manual_parts_to_pdf(score, output_directory, song_name)
         return
@@ -16,20 +19,40 @@ def convert_mscz_to_pdfs(mscz_filename, output_directory, song_name):
     # I'm choosing not to optimize the spatium for the score because this is what the user sees in MuseScore. Optimizing
     # spatium is just for the parts that the users don't see (which is a tad arbitrarily decided, and should
     # probably be an option).
-    score_output_filename = os.path.join(output_directory, f'{song_name}.gen.pdf')
+    score_output_filename = os.path.join(output_directory, MuseScore.get_score_pdf_filename(song_name))
     print(f'converting {score_output_filename}')
-    _convert_to_pdf(score, score_output_filename)
+    _convert_to_pdf_and_count_pages(score, score_output_filename)
     if score.get_number_of_parts() == 1:
         return
 
-    for part in score.generate_part_scores():
-        part_output_filename = os.path.join(output_directory, f'{song_name} - {part.name}.gen.pdf')
+    with timed_span('split', song_name=song_name):
+        part_scores = score.generate_part_scores()
+
+    # Spatium search results from the previous conversion of this song, written alongside the PDFs. Parts that no longer
+    # exist are dropped from the memo.
+    layout_memo_filepath = os.path.join(output_directory, get_layout_memo_filename(song_name))
+    previous_part_layouts = _load_layout_memo(layout_memo_filepath)
+    part_layouts = {}
+    for part in part_scores:
+        part_output_filename = os.path.join(output_directory, MuseScore.get_part_pdf_filename(song_name, part.name))
         print(f'converting {part_output_filename}')
-        _convert_to_pdf_optimize_spatium(part, part_output_filename)
+        part_layouts[part.name] = _convert_to_pdf_optimize_spatium(part, part_output_filename,
+                                                                   previous_part_layouts.get(part.name))
+
+    _dump_layout_memo(part_layouts, layout_memo_filepath)
+
+
+def get_layout_memo_filename(song_name):
+    return f'{song_name}.layout.json'
+
 
 def _convert_with_manual_parts_to_pdf(score, out_dir, song_name):
     with scoped_named_temporary_file(content=score.get_mscx_as_string(), suffix='.mscx') as mscx:
-        MuseScore.convert_mscz_to_pdf_with_manual_parts(song_name, mscx, out_dir)
+        pdf_filepaths = MuseScore.convert_mscz_to_pdf_with_manual_parts(song_name, mscx, out_dir,
+                                                                        score.get_part_names())
+
+    for pdf_filepath in pdf_filepaths:
+        record_value('pdf_pages', _get_pdf_num_pages(pdf_filepath), filename=pdf_filepath)
 
 
 def _convert_to_pdf(score, out_filepath, spatium=None):
@@ -37,22 +60,67 @@ def _convert_to_pdf(score, out_filepath, spatium=None):
         MuseScore.convert_to_pdf(mscx, out_filepath, spatium)
 
 
+# Returns the part's layout: the chosen spatium and its page count. If a previous layout is given and its spatium still
+# gives the same page count, it's reused after that single render. Most re-saves don't change the page count, and then
+# neither does the optimal spatium (barring a rare shift in where the page count would jump).
 # TODO: if default spatium and min spatium have same number of pages, can just return right away.
 #       Probably do a binary search for optimal spatium
-def _convert_to_pdf_optimize_spatium(score, out_filepath):
+def _convert_to_pdf_optimize_spatium(score, out_filepath, previous_layout=None):
     _MINIMUM_SPATIUM = 1.5
     _MUSESCORE_DEFAULT_SPATIUM = 1.76389
     _SPATIUM_INCREMENT = 0.025
 
+    if previous_layout is not None:
+        pdf_num_pages = _convert_to_pdf_and_count_pages(score, out_filepath, previous_layout['spatium'])
+        if pdf_num_pages == previous_layout['num_pages']:
+            return {'spatium': previous_layout['spatium'], 'num_pages': pdf_num_pages}
+        print(f'page count at spatium {previous_layout["spatium"]} changed from {previous_layout["num_pages"]} to '
+              f'{pdf_num_pages}, searching again')
+
     spatium = _MINIMUM_SPATIUM
+    optimal_spatium = None
     minimum_pdf_num_pages = None
     while spatium <= _MUSESCORE_DEFAULT_SPATIUM:
-        _convert_to_pdf(score, out_filepath, spatium)
-        pdf_num_pages = PdfFileReader(out_filepath).getNumPages()
+        pdf_num_pages = _convert_to_pdf_and_count_pages(score, out_filepath, spatium)
         if minimum_pdf_num_pages is None:
             minimum_pdf_num_pages = pdf_num_pages
         elif pdf_num_pages > minimum_pdf_num_pages:
-            _convert_to_pdf(score, out_filepath, spatium - _SPATIUM_INCREMENT)
+            _convert_to_pdf(score, out_filepath, optimal_spatium)
             break
 
+        optimal_spatium = spatium
         spatium += _SPATIUM_INCREMENT
+
+    return {'spatium': optimal_spatium, 'num_pages': minimum_pdf_num_pages}
+
+
+def _convert_to_pdf_and_count_pages(score, out_filepath, spatium=None):
+    _convert_to_pdf(score, out_filepath, spatium)
+    pdf_num_pages = _get_pdf_num_pages(out_filepath)
+    record_value('pdf_pages', pdf_num_pages, filename=out_filepath, spatium=spatium)
+    return pdf_num_pages
+
+
+# A missing, unreadable or outdated memo just means every part is searched from scratch.
+def _load_layout_memo(filepath):
+    if not os.path.exists(filepath):
+        return {}
+
+    try:
+        with open(filepath) as f:
+            layout_memo = json.load(f)
+    except ValueError:
+        return {}
+
+    return layout_memo['parts'] if layout_memo.get('version') == _LAYOUT_MEMO_VERSION else {}
+
+
+def _dump_layout_memo(part_layouts, filepath):
+    with open(filepath, 'w') as f:
+        json.dump({'version': _LAYOUT_MEMO_VERSION, 'parts': part_layouts}, f, indent=2, sort_keys=True)
+
+
+# PyPDF2 is only needed once a PDF has been rendered, so it isn't imported (at a noticeable startup cost) until then.
+def _get_pdf_num_pages(pdf_filepath):
+    from PyPDF2 import PdfFileReader  # pylint: disable=import-outside-toplevel
+    return PdfFileReader(pdf_filepath).getNumPages()
@@ -32,6 +32,17 @@ class Score:
 
         return True
 
+    # Names of the parts that get their own PDF, i.e. the manual parts, or the parts generate_part_scores would split
+    # out. Single part scores only get the score PDF, so they have none.
+    def get_part_names(self):
+        if self.has_manual_parts():
+            return [find_exactly_one(sub_score_node, 'metaTag/[@name="partName"]').text
+                    for sub_score_node in self._xml_tree.findall('Score/Score')]
+        if self.get_number_of_parts() == 1:
+            return []
+
+        return self._get_split_part_names()
+
     def generate_part_scores(self):
         if self.has_manual_parts():
             raise ValueError('Can\'t split part scores for score with manual parts')
@@ -40,7 +51,8 @@ class Score:
             return [Score(None, copy.deepcopy(self._xml_tree))]
 
         parts = _PartScore.create_parts_from_xml(self._xml_tree)
-        self._fix_split_part_score_part_names(parts)
+        for part, part_name in zip(parts, self._get_split_part_names()):
+            part.set_name(part_name)
 
         return [Score(p.get_name(), p.xml_tree) for p in parts]
 
@@ -65,20 +77,25 @@ class Score:
 
         raise ValueError(f'No .mscx files found in {filepath}')
 
-    def _fix_split_part_score_part_names(self, part_scores):
+    def _get_split_part_names(self):
+        part_names = [find_exactly_one(part_node, 'Instrument/longName').text
+                      for part_node in self._xml_tree.findall('Score/Part')]
         part_name_to_num_appearances = defaultdict(int)
-        for part_node in self._xml_tree.findall('Score/Part'):
-            part_name_to_num_appearances[find_exactly_one(part_node, 'Instrument/longName').text] += 1
+        for part_name in part_names:
+            part_name_to_num_appearances[part_name] += 1
 
         # Note that this does not handle if there's a "Violin 1", "Violin", and "Violin" part.
         # It's unclear what should be done (maybe the violin parts should be named "Solo Violin", for example)
         part_name_to_correct_part_number = defaultdict(int)
-        for part in part_scores:
-            part_name = part.get_name()
+        split_part_names = []
+        for part_name in part_names:
             is_duplicate_part_name = part_name_to_num_appearances[part_name] > 1
             if is_duplicate_part_name:
                 part_name_to_correct_part_number[part_name] += 1
-                part.set_name(f'{part_name} {part_name_to_correct_part_number[part_name]}')
+                part_name = f'{part_name} {part_name_to_correct_part_number[part_name]}'
+            split_part_names.append(part_name)
+
+        return split_part_names
 
 
 class _PartScore:
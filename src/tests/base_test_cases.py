@@ -0,0 +1,20 @@
+import tempfile
+import unittest
+
+from benchmarks.fake_musescore import FAKE_MUSESCORE_PATH
+from musescore.musescore_runner import MuseScore
+
+
+# Gives each test a fresh temporary directory at self.tempdir, removed after the test.
+class TempdirTestCase(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.tempdir = tempdir.name
+
+
+# Also runs MuseScore conversions with benchmarks/fake_musescore.py.
+class FakeMuseScoreTestCase(TempdirTestCase):
+    def setUp(self):
+        super().setUp()
+        MuseScore.binary_path = FAKE_MUSESCORE_PATH
@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+import datetime
+import hashlib
+import os
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from drive.drive import Drive, _get_discovery_document
+from tests.base_test_cases import TempdirTestCase
+from utils.instrumentation import get_counter
+
+_DIRECTORY_ID = 'directory_id'
+_FILE_ID = 'file_id'
+_PDF_CONTENT = b'%PDF-1.4\n'
+_SOURCE_MODIFIED_DATETIME = datetime.datetime(2020, 7, 14, 12, 34, 56, 789000)
+_CACHED_DISCOVERY_DOCUMENT_TEXT = '{"revision": "cached"}'
+_DOWNLOADED_DISCOVERY_DOCUMENT_TEXT = '{"revision": "downloaded"}'
+_EIGHT_DAYS_SECONDS = 8 * 24 * 60 * 60
+
+
+class TestDrive(TempdirTestCase):
+    def setUp(self):
+        super().setUp()
+        self._pdf_filepath = os.path.join(self.tempdir, 'song.gen.pdf')
+        with open(self._pdf_filepath, 'wb') as f:
+            f.write(_PDF_CONTENT)
+
+    def test_upload_skipped_when_content_unchanged(self):
+        files_service = _FakeFilesService(md5_checksum=hashlib.md5(_PDF_CONTENT).hexdigest())
+        skipped_bytes_before = get_counter('upload_skipped_bytes')
+
+        file_id = Drive(files_service).upload_or_update_file(
+            self._pdf_filepath, _DIRECTORY_ID, _SOURCE_MODIFIED_DATETIME)
+
+        self.assertEqual(file_id, _FILE_ID)
+        self.assertEqual(len(files_service.update_calls), 1)
+        update_kwargs = files_service.update_calls[0]
+        self.assertNotIn('media_body', update_kwargs)
+        # Just newer than the source, by Drive's clock rather than the local one.
+        self.assertEqual(update_kwargs['body']['modifiedTime'], '2020-07-14T12:34:56.790000Z')
+        self.assertEqual(get_counter('upload_skipped_bytes') - skipped_bytes_before, len(_PDF_CONTENT))
+
+    def test_upload_when_content_changed(self):
+        files_service = _FakeFilesService(md5_checksum='0' * 32)
+
+        Drive(files_service).upload_or_update_file(
+            self._pdf_filepath, _DIRECTORY_ID, _SOURCE_MODIFIED_DATETIME)
+
+        self.assertEqual(len(files_service.update_calls), 1)
+        update_kwargs = files_service.update_calls[0]
+        self.assertIn('media_body', update_kwargs)
+        self.assertNotIn('modifiedTime', update_kwargs['body'])
+
+
+class TestDiscoveryDocument(TempdirTestCase):
+    def setUp(self):
+        super().setUp()
+        self._cache_filepath = os.path.join(self.tempdir, 'drive_v3_discovery.json')
+        self._requests_get = mock.Mock(return_value=_FakeResponse(_DOWNLOADED_DISCOVERY_DOCUMENT_TEXT))
+        for target, new in [('drive.drive._DISCOVERY_CACHE_FILENAME', self._cache_filepath),
+                            ('drive.drive._discovery_document', None),
+                            ('drive.drive.requests.get', self._requests_get)]:
+            patcher = mock.patch(target, new)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_missing_cache_downloaded(self):
+        self.assertDictEqual(_get_discovery_document(), {'revision': 'downloaded'})
+        with open(self._cache_filepath) as f:
+            self.assertEqual(f.read(), _DOWNLOADED_DISCOVERY_DOCUMENT_TEXT)
+
+    def test_fresh_cache_used_without_download(self):
+        self._write_cache(age_seconds=0)
+
+        self.assertDictEqual(_get_discovery_document(), {'revision': 'cached'})
+        self.assertDictEqual(_get_discovery_document(), {'revision': 'cached'})
+        self._requests_get.assert_not_called()
+
+    def test_stale_cache_downloaded_again(self):
+        self._write_cache(age_seconds=_EIGHT_DAYS_SECONDS)
+
+        self.assertDictEqual(_get_discovery_document(), {'revision': 'downloaded'})
+        self._requests_get.assert_called_once()
+
+    def test_stale_cache_used_when_download_fails(self):
+        self._write_cache(age_seconds=_EIGHT_DAYS_SECONDS)
+        self._requests_get.side_effect = requests.ConnectionError
+
+        self.assertDictEqual(_get_discovery_document(), {'revision': 'cached'})
+
+    def test_download_failure_raised_without_cache(self):
+        self._requests_get.side_effect = requests.ConnectionError
+
+        with self.assertRaises(requests.ConnectionError):
+            _get_discovery_document()
+
+    def _write_cache(self, age_seconds):
+        with open(self._cache_filepath, 'w') as f:
+            f.write(_CACHED_DISCOVERY_DOCUMENT_TEXT)
+        mtime = time.time() - age_seconds
+        os.utime(self._cache_filepath, (mtime, mtime))
+
+
+# Stands in for the Drive API service and its files() resource, with the single existing song.gen.pdf in
+# _DIRECTORY_ID.
+class _FakeFilesService:
+    def __init__(self, md5_checksum):
+        self._md5_checksum = md5_checksum
+        self.update_calls = []
+
+    def files(self):
+        return self
+
+    def list(self, **_):
+        return _FakeRequest({
+            'incompleteSearch': False,
+            'files': [{'id': _FILE_ID, 'name': 'song.gen.pdf', 'mimeType': 'application/pdf',
+                       'parents': [_DIRECTORY_ID], 'modifiedTime': '2020-07-14T00:00:00.000Z',
+                       'md5Checksum': self._md5_checksum}]
+        })
+
+    def update(self, **kwargs):
+        self.update_calls.append(kwargs)
+        return _FakeRequest({'id': kwargs['fileId']})
+
+
+@dataclass
+class _FakeRequest:
+    response: dict
+
+    def execute(self):
+        return self.response
+
+
+@dataclass
+class _FakeResponse:
+    text: str
+
+    def raise_for_status(self):
+        pass
+
+
+if __name__ == '__main__':
+    unittest.main()
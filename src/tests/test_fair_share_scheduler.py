@@ -0,0 +1,203 @@
+import threading
+import time
+import unittest
+
+from utils.fair_share_scheduler import FairShareScheduler
+from utils.job_queue import JobQueue, PRIORITY_BULK, PRIORITY_CHANGED
+
+_TIMEOUT_SECONDS = 5
+
+
+class TestFairShareScheduler(unittest.TestCase):
+    def setUp(self):
+        self._job_queue = JobQueue(':memory:', max_attempts=1)
+        self._scheduler = FairShareScheduler(1, lambda: None, self._run_job, self._job_queue)
+        self._run_order = []
+        self._all_jobs_done = threading.Event()
+        self._num_jobs_remaining = 0
+
+        # The single worker is held on this job so everything submitted afterwards is dispatched by fair share.
+        self._blocker_started = threading.Event()
+        self._blocker_released = threading.Event()
+        self._scheduler.add_root('blocker', 1)
+        self._scheduler.submit('blocker', 'blocker', PRIORITY_CHANGED)
+
+    def test_equal_priorities_alternate(self):
+        self._add_roots_and_start(a=1, b=1)
+        self._submit_jobs('a', 4)
+        self._submit_jobs('b', 2)
+
+        self._release_and_wait()
+        self.assertListEqual(self._run_order, ['a0', 'b0', 'a1', 'b1', 'a2', 'a3'])
+
+    def test_higher_priority_gets_proportionally_more(self):
+        self._add_roots_and_start(a=1, b=2)
+        self._submit_jobs('a', 3)
+        self._submit_jobs('b', 6)
+
+        self._release_and_wait()
+        self.assertListEqual(self._run_order, ['a0', 'b0', 'b1', 'a1', 'b2', 'b3', 'a2', 'b4', 'b5'])
+
+    def test_changed_jobs_run_before_bulk_jobs(self):
+        self._add_roots_and_start(a=1)
+        self._submit_jobs('a', 2, PRIORITY_BULK)
+        self._num_jobs_remaining += 1
+        self._scheduler.submit('a', 'changed', PRIORITY_CHANGED)
+
+        self._release_and_wait()
+        self.assertListEqual(self._run_order, ['changed', 'a0', 'a1'])
+
+    def test_duplicate_pending_job_runs_once(self):
+        self._add_roots_and_start(a=1)
+        self._submit_jobs('a', 1)
+        self._scheduler.submit('a', 'a0', PRIORITY_CHANGED)
+
+        self._release_and_wait()
+        self.assertListEqual(self._run_order, ['a0'])
+
+    def test_job_failure_does_not_stop_other_jobs(self):
+        self._add_roots_and_start(a=1)
+        self._scheduler.submit('a', 'fail', PRIORITY_CHANGED)
+        self._submit_jobs('a', 1)
+
+        self._release_and_wait()
+        self.assertListEqual(self._run_order, ['a0'])
+        self.assertListEqual([j.job_key for j in self._job_queue.get_dead_jobs()], ['fail'])
+
+    def test_returning_root_not_starved_by_newly_active_root(self):
+        self._add_roots_and_start(a=1, b=1)
+        self._submit_jobs('a', 30)
+        self._release_and_wait()
+
+        # b has been idle all along, and nothing is pending when its burst arrives.
+        self._hold_worker()
+        self._submit_jobs('b', 30)
+        self._num_jobs_remaining += 1
+        self._scheduler.submit('a', 'a_new', PRIORITY_CHANGED)
+
+        self._release_and_wait()
+        self.assertListEqual(self._run_order[30:33], ['b0', 'a_new', 'b1'])
+
+    def _add_roots_and_start(self, **root_id_to_priority):
+        for root_id, priority in root_id_to_priority.items():
+            self._scheduler.add_root(root_id, priority)
+        self._scheduler.start()
+        self.assertTrue(self._blocker_started.wait(_TIMEOUT_SECONDS))
+
+    def _hold_worker(self):
+        self._blocker_started.clear()
+        self._blocker_released.clear()
+        self._all_jobs_done.clear()
+        self._scheduler.submit('blocker', 'blocker', PRIORITY_CHANGED)
+        self.assertTrue(self._blocker_started.wait(_TIMEOUT_SECONDS))
+
+    def _submit_jobs(self, root_id, num_jobs, priority=PRIORITY_CHANGED):
+        for i in range(num_jobs):
+            self._num_jobs_remaining += 1
+            self._scheduler.submit(root_id, f'{root_id}{i}', priority)
+
+    def _run_job(self, _, job_key):
+        if job_key == 'blocker':
+            self._blocker_started.set()
+            self._blocker_released.wait(_TIMEOUT_SECONDS)
+            return
+        if job_key == 'fail':
+            raise ValueError('job failed')
+
+        self._run_order.append(job_key)
+        self._num_jobs_remaining -= 1
+        if self._num_jobs_remaining == 0:
+            self._all_jobs_done.set()
+
+    def _release_and_wait(self):
+        self._blocker_released.set()
+        self.assertTrue(self._all_jobs_done.wait(_TIMEOUT_SECONDS))
+
+
+class TestFairShareSlots(unittest.TestCase):
+    def setUp(self):
+        self._scheduler = FairShareScheduler(10, lambda: None, self._run_job, JobQueue(':memory:', max_attempts=1))
+        self._slots = self._scheduler.create_slots(1)
+        self._grant_order = []
+        self._all_jobs_done = threading.Event()
+        self._num_jobs_remaining = 0
+
+        # Holds the only slot until every other job is waiting for it.
+        self._holder_started = threading.Event()
+        self._holder_released = threading.Event()
+        self._scheduler.add_root('holder', 1)
+        self._scheduler.start()
+
+    def test_slots_shared_by_priority_not_arrival(self):
+        self._scheduler.add_root('a', 1)
+        self._scheduler.add_root('b', 2)
+        self._hold_slot()
+        # All of a's jobs start waiting for the slot before any of b's.
+        self._submit_jobs_and_wait_for_slot('a', 3)
+        self._submit_jobs_and_wait_for_slot('b', 6)
+
+        self._release_and_wait()
+        # Ties in virtual time can swap neighbours, but every third slot b has had two thirds of them.
+        self.assertEqual(self._grant_order[:3].count('b'), 2)
+        self.assertEqual(self._grant_order[:6].count('b'), 4)
+
+    def test_returning_root_not_starved_by_newly_active_root(self):
+        self._scheduler.add_root('a', 1)
+        self._scheduler.add_root('b', 1)
+        self._run_jobs_one_at_a_time('a', 30)
+
+        self._hold_slot()
+        self._submit_jobs_and_wait_for_slot('b', 6)
+        self._submit_jobs_and_wait_for_slot('a', 1)
+
+        self._release_and_wait()
+        # Level with b, a loses only the tie to b's jobs that were waiting first.
+        self.assertListEqual(self._grant_order[30:33], ['b', 'b', 'a'])
+
+    def _hold_slot(self):
+        self._holder_started.clear()
+        self._holder_released.clear()
+        self._scheduler.submit('holder', 'holder', PRIORITY_CHANGED)
+        self.assertTrue(self._holder_started.wait(_TIMEOUT_SECONDS))
+
+    def _release_and_wait(self):
+        self._holder_released.set()
+        self.assertTrue(self._all_jobs_done.wait(_TIMEOUT_SECONDS))
+
+    # Takes the slot without contention each time, so nothing is ever waiting for it.
+    def _run_jobs_one_at_a_time(self, root_id, num_jobs):
+        for i in range(num_jobs):
+            self._all_jobs_done.clear()
+            self._num_jobs_remaining += 1
+            self._scheduler.submit(root_id, f'{root_id}{i}', PRIORITY_CHANGED)
+            self.assertTrue(self._all_jobs_done.wait(_TIMEOUT_SECONDS))
+        self._all_jobs_done.clear()
+
+    def _submit_jobs_and_wait_for_slot(self, root_id, num_jobs):
+        for i in range(num_jobs):
+            self._num_jobs_remaining += 1
+            self._scheduler.submit(root_id, f'{root_id}{i}', PRIORITY_CHANGED)
+
+        deadline = time.time() + _TIMEOUT_SECONDS
+        while self._slots._waiting_root_ids.count(root_id) < num_jobs:  # pylint: disable=protected-access
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.01)
+
+    def _run_job(self, _, job_key):
+        self._slots.acquire()
+        try:
+            if job_key == 'holder':
+                self._holder_started.set()
+                self._holder_released.wait(_TIMEOUT_SECONDS)
+                return
+
+            self._grant_order.append(job_key[0])
+            self._num_jobs_remaining -= 1
+            if self._num_jobs_remaining == 0:
+                self._all_jobs_done.set()
+        finally:
+            self._slots.release()
+
+
+if __name__ == '__main__':
+    unittest.main()
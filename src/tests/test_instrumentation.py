@@ -0,0 +1,87 @@
+import json
+import os
+import unittest
+
+from tests.base_test_cases import TempdirTestCase
+from utils.instrumentation import get_counter, get_prometheus_text, increment_counter, record_value, \
+    set_jsonl_output, timed_span
+
+_PREFIX = 'musescore_pdf_generator'
+
+
+# Instrumentation state is process-wide, so each test records under names no other code uses and looks only at those.
+class TestInstrumentation(TempdirTestCase):
+    def setUp(self):
+        super().setUp()
+        self._jsonl_filepath = os.path.join(self.tempdir, 'metrics.jsonl')
+        set_jsonl_output(self._jsonl_filepath)
+        self.addCleanup(set_jsonl_output, None)
+
+    def test_span_written_with_attributes(self):
+        with timed_span('test_span', song='song', num_parts=2):
+            pass
+
+        [event] = self._read_events('test_span')
+        self.assertEqual(event['type'], 'span')
+        self.assertIsNone(event['error'])
+        self.assertGreaterEqual(event['duration'], 0)
+        self.assertDictEqual(event['attributes'], {'song': 'song', 'num_parts': 2})
+
+    def test_span_records_error_and_reraises(self):
+        with self.assertRaises(ValueError):
+            with timed_span('test_failed_span'):
+                raise ValueError('failed')
+
+        [event] = self._read_events('test_failed_span')
+        self.assertEqual(event['error'], 'ValueError')
+        self.assertIn(f'{_PREFIX}_span_seconds_count{{span="test_failed_span"}} 1', self._get_prometheus_lines())
+
+    def test_value_written_and_summed(self):
+        record_value('test_value', 2, song='song')
+        record_value('test_value', 3.5)
+
+        events = self._read_events('test_value')
+        self.assertListEqual([e['type'] for e in events], ['value', 'value'])
+        self.assertListEqual([e['value'] for e in events], [2, 3.5])
+        self.assertListEqual([e['attributes'] for e in events], [{'song': 'song'}, {}])
+        prometheus_lines = self._get_prometheus_lines()
+        self.assertIn(f'{_PREFIX}_test_value_sum 5.5', prometheus_lines)
+        self.assertIn(f'{_PREFIX}_test_value_count 2', prometheus_lines)
+
+    def test_non_json_attributes_written_as_strings(self):
+        record_value('test_class_value', 1, cls=object)
+
+        [event] = self._read_events('test_class_value')
+        self.assertEqual(event['attributes']['cls'], str(object))
+
+    def test_counters_kept_per_label_set(self):
+        increment_counter('test_counter', result='ok', kind='score')
+        increment_counter('test_counter', 2, kind='score', result='ok')
+        increment_counter('test_counter', kind='part', result='ok')
+        increment_counter('test_counter')
+
+        self.assertEqual(get_counter('test_counter', result='ok', kind='score'), 3)
+        self.assertEqual(get_counter('test_counter', kind='part', result='ok'), 1)
+        self.assertEqual(get_counter('test_counter'), 1)
+        self.assertEqual(get_counter('test_counter', kind='other'), 0)
+        prometheus_lines = self._get_prometheus_lines()
+        self.assertIn(f'{_PREFIX}_test_counter_total{{}} 1', prometheus_lines)
+        self.assertIn(f'{_PREFIX}_test_counter_total{{kind="part",result="ok"}} 1', prometheus_lines)
+        self.assertIn(f'{_PREFIX}_test_counter_total{{kind="score",result="ok"}} 3', prometheus_lines)
+
+    def test_prometheus_text_ends_with_newline(self):
+        increment_counter('test_newline_counter')
+
+        self.assertTrue(get_prometheus_text().endswith('\n'))
+
+    def _read_events(self, name):
+        with open(self._jsonl_filepath) as f:
+            return [e for e in map(json.loads, f) if e['name'] == name]
+
+    @staticmethod
+    def _get_prometheus_lines():
+        return get_prometheus_text().splitlines()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+
+from utils.job_queue import JobQueue, PRIORITY_BULK, PRIORITY_CHANGED
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self._job_queue = JobQueue(':memory:', max_attempts=3, retry_backoff_seconds=0)
+
+    def test_claims_by_priority_then_age(self):
+        self._job_queue.enqueue('root', 'bulk', PRIORITY_BULK)
+        self._job_queue.enqueue('root', 'changed1', PRIORITY_CHANGED)
+        self._job_queue.enqueue('root', 'changed2', PRIORITY_CHANGED)
+
+        self.assertListEqual(self._claim_all('root'), ['changed1', 'changed2', 'bulk'])
+        self.assertIsNone(self._job_queue.claim_next('root'))
+
+    def test_reenqueue_pending_raises_priority(self):
+        self._job_queue.enqueue('root', 'a', PRIORITY_BULK)
+        self._job_queue.enqueue('root', 'b', PRIORITY_BULK)
+        self._job_queue.enqueue('root', 'b', PRIORITY_CHANGED)
+        self._job_queue.enqueue('root', 'b', PRIORITY_BULK)
+
+        self.assertListEqual(self._claim_all('root'), ['b', 'a'])
+
+    def test_done_job_not_claimed_again(self):
+        self._job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+        self._job_queue.mark_done(self._job_queue.claim_next('root'))
+
+        self.assertIsNone(self._job_queue.claim_next('root'))
+        self.assertSetEqual(self._job_queue.get_ready_root_ids(), set())
+
+    def test_reenqueue_while_running_reruns_after_done(self):
+        self._job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+        job_key = self._job_queue.claim_next('root')
+        self._job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+        self.assertIsNone(self._job_queue.claim_next('root'))
+
+        self._job_queue.mark_done(job_key)
+        self.assertEqual(self._job_queue.claim_next('root'), 'a')
+
+    def test_failures_retry_then_dead_letter(self):
+        self._job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+        self.assertFalse(self._job_queue.mark_failed(self._job_queue.claim_next('root'), 'error 1'))
+        self.assertFalse(self._job_queue.mark_failed(self._job_queue.claim_next('root'), 'error 2'))
+        self.assertTrue(self._job_queue.mark_failed(self._job_queue.claim_next('root'), 'error 3'))
+
+        self.assertIsNone(self._job_queue.claim_next('root'))
+        [dead_job] = self._job_queue.get_dead_jobs()
+        self.assertEqual(dead_job.job_key, 'a')
+        self.assertEqual(dead_job.attempts, 3)
+        self.assertEqual(dead_job.last_error, 'error 3')
+
+    def test_reenqueue_while_running_reruns_after_failure(self):
+        job_queue = JobQueue(':memory:', max_attempts=1)
+        job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+        job_key = job_queue.claim_next('root')
+        job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+
+        self.assertFalse(job_queue.mark_failed(job_key, 'error'))
+        self.assertEqual(job_queue.claim_next('root'), 'a')
+        self.assertListEqual(job_queue.get_dead_jobs(), [])
+
+    def test_dead_job_only_revived_when_requested(self):
+        job_queue = JobQueue(':memory:', max_attempts=1)
+        job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+        job_queue.mark_failed(job_queue.claim_next('root'), 'error')
+
+        job_queue.enqueue('root', 'a', PRIORITY_BULK, revive_dead=False)
+        self.assertIsNone(job_queue.claim_next('root'))
+
+        job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+        self.assertEqual(job_queue.claim_next('root'), 'a')
+        self.assertListEqual(job_queue.get_dead_jobs(), [])
+
+    def test_change_while_waiting_for_retry_resets_attempts(self):
+        job_queue = JobQueue(':memory:', max_attempts=2, retry_backoff_seconds=60)
+        job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+        job_queue.mark_failed(job_queue.claim_next('root'), 'error 1')
+        # Bulk regeneration doesn't cut the backoff short.
+        job_queue.enqueue('root', 'a', PRIORITY_BULK, revive_dead=False)
+        self.assertIsNone(job_queue.claim_next('root'))
+
+        job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+        job_key = job_queue.claim_next('root')
+        self.assertEqual(job_key, 'a')
+        # Back to the full max_attempts, so this isn't the last one.
+        self.assertFalse(job_queue.mark_failed(job_key, 'error 2'))
+
+    def test_retry_waits_for_backoff(self):
+        job_queue = JobQueue(':memory:', retry_backoff_seconds=60)
+        job_queue.enqueue('root', 'a', PRIORITY_CHANGED)
+        job_queue.mark_failed(job_queue.claim_next('root'), 'error')
+
+        self.assertIsNone(job_queue.claim_next('root'))
+        self.assertGreater(job_queue.get_next_ready_time(['root']), 0)
+        self.assertIsNone(job_queue.get_next_ready_time(['other_root']))
+
+    def test_running_jobs_resume_after_restart(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            db_filepath = os.path.join(tempdir, 'jobs.sqlite3')
+            job_queue = JobQueue(db_filepath)
+            job_queue.enqueue('root', 'done', PRIORITY_CHANGED)
+            job_queue.enqueue('root', 'running', PRIORITY_CHANGED)
+            job_queue.enqueue('root', 'pending', PRIORITY_BULK)
+            job_queue.mark_done(job_queue.claim_next('root'))
+            job_queue.claim_next('root')
+            del job_queue
+
+            self.assertListEqual(self._claim_all('root', JobQueue(db_filepath)), ['running', 'pending'])
+
+    def _claim_all(self, root_id, job_queue=None):
+        job_queue = job_queue or self._job_queue
+        job_keys = []
+        job_key = job_queue.claim_next(root_id)
+        while job_key is not None:
+            job_keys.append(job_key)
+            job_key = job_queue.claim_next(root_id)
+
+        return job_keys
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import threading
+import unittest
+
+from benchmarks.synthetic_scores import create_synthetic_mscx
+from musescore.musescore_runner import MuseScore
+from tests.base_test_cases import FakeMuseScoreTestCase
+
+_MAX_CONCURRENT_PROCESSES = 2
+_NUM_CONVERSIONS = 6
+
+
+class TestMuseScore(FakeMuseScoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self._process_slots = _CountingProcessSlots(_MAX_CONCURRENT_PROCESSES)
+        MuseScore.set_process_slots(self._process_slots)
+        self._mscx_filepath = os.path.join(self.tempdir, 'song.mscx')
+        with open(self._mscx_filepath, 'wb') as f:
+            f.write(create_synthetic_mscx(1, 8))
+
+    def tearDown(self):
+        MuseScore.set_process_slots(None)
+        os.environ.pop('FAKE_MUSESCORE_RENDER_SECONDS', None)
+
+    def test_concurrent_conversions_limited_to_process_slots(self):
+        # Long enough for the conversions to overlap.
+        os.environ['FAKE_MUSESCORE_RENDER_SECONDS'] = '0.1'
+        threads = [threading.Thread(target=MuseScore.convert_to_pdf,
+                                    args=(self._mscx_filepath, os.path.join(self.tempdir, f'{i}.gen.pdf')))
+                   for i in range(_NUM_CONVERSIONS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Each conversion runs MuseScore twice, once to apply styles and once to render.
+        self.assertEqual(self._process_slots.num_acquired, 2 * _NUM_CONVERSIONS)
+        self.assertEqual(self._process_slots.max_num_held, _MAX_CONCURRENT_PROCESSES)
+        for i in range(_NUM_CONVERSIONS):
+            self.assertTrue(os.path.exists(os.path.join(self.tempdir, f'{i}.gen.pdf')))
+
+
+# A BoundedSemaphore that keeps track of how many slots were held at once.
+class _CountingProcessSlots:
+    def __init__(self, num_slots):
+        self._semaphore = threading.BoundedSemaphore(num_slots)
+        self._lock = threading.Lock()
+        self._num_held = 0
+        self.num_acquired = 0
+        self.max_num_held = 0
+
+    def acquire(self):
+        self._semaphore.acquire()
+        with self._lock:
+            self._num_held += 1
+            self.num_acquired += 1
+            self.max_num_held = max(self.max_num_held, self._num_held)
+
+    def release(self):
+        with self._lock:
+            self._num_held -= 1
+        self._semaphore.release()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import unittest
+
+from benchmarks.synthetic_scores import write_synthetic_mscz
+from musescore.pdf_conversion import convert_mscz_to_pdfs, get_layout_memo_filename
+from tests.base_test_cases import FakeMuseScoreTestCase
+from utils.instrumentation import get_counter
+
+_SONG_NAME = 'song'
+_NUM_PARTS = 3
+_MULTI_PART_MANUAL_PARTS_PATH = 'test_resources/multi_part_manual_parts.mscz'
+
+
+class TestPdfConversion(FakeMuseScoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self._mscz_filepath = os.path.join(self.tempdir, f'{_SONG_NAME}.mscz')
+
+    def test_first_conversion_writes_layout_memo(self):
+        write_synthetic_mscz(self._mscz_filepath, _NUM_PARTS, 300)
+        self._convert_and_count_renders()
+
+        with open(os.path.join(self.tempdir, get_layout_memo_filename(_SONG_NAME))) as f:
+            part_layouts = json.load(f)['parts']
+        self.assertEqual(len(part_layouts), _NUM_PARTS)
+        for part_layout in part_layouts.values():
+            self.assertGreaterEqual(part_layout['spatium'], 1.5)
+            self.assertGreater(part_layout['num_pages'], 0)
+
+    def test_unchanged_page_count_renders_each_part_once(self):
+        write_synthetic_mscz(self._mscz_filepath, _NUM_PARTS, 300)
+        self._convert_and_count_renders()
+
+        # One render for the full score, one per part.
+        self.assertEqual(self._convert_and_count_renders(), 1 + _NUM_PARTS)
+
+    def test_changed_page_count_searches_again(self):
+        write_synthetic_mscz(self._mscz_filepath, _NUM_PARTS, 300)
+        first_num_renders = self._convert_and_count_renders()
+        write_synthetic_mscz(self._mscz_filepath, _NUM_PARTS, 400)
+
+        self.assertGreater(self._convert_and_count_renders(), first_num_renders)
+
+    def test_manual_parts_only_normalizes_own_outputs(self):
+        shutil.copy(_MULTI_PART_MANUAL_PARTS_PATH, self._mscz_filepath)
+        # Looks like one of this song's parts, but isn't one of its manual parts (e.g. it's from a song "song - Bar").
+        other_pdf_filepath = os.path.join(self.tempdir, f'{_SONG_NAME} - Bar.gen.pdf')
+        other_pdf_content = b'%PDF-1.4\n<< /CreationDate (D:20200714123456) >>\n'
+        with open(other_pdf_filepath, 'wb') as f:
+            f.write(other_pdf_content)
+
+        self._convert_and_count_renders()
+
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, f'{_SONG_NAME} - Violin Part.gen.pdf')))
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, f'{_SONG_NAME} - Piano.gen.pdf')))
+        with open(other_pdf_filepath, 'rb') as f:
+            self.assertEqual(f.read(), other_pdf_content)
+
+    def _convert_and_count_renders(self):
+        num_renders_before = get_counter('musescore_renders')
+        convert_mscz_to_pdfs(self._mscz_filepath, self.tempdir, _SONG_NAME)
+        return get_counter('musescore_renders') - num_renders_before
+
+
+if __name__ == '__main__':
+    unittest.main()
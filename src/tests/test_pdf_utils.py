@@ -0,0 +1,45 @@
+import os
+import unittest
+
+from tests.base_test_cases import TempdirTestCase
+from utils.pdf_utils import normalize_pdf_dates
+
+_PDF_CONTENT = (b'%PDF-1.4\n1 0 obj\n<< /Creator (MuseScore) /CreationDate (D:20201010123456+02\'00\')\n'
+                b'/ModDate (D:20201010123457Z) >>\nendobj\n')
+
+
+class TestPdfUtils(TempdirTestCase):
+    def setUp(self):
+        super().setUp()
+        self._pdf_filepath = os.path.join(self.tempdir, 'song.gen.pdf')
+
+    def test_normalizes_both_dates(self):
+        normalized_content = self._write_and_normalize(_PDF_CONTENT)
+
+        self.assertIn(b'/CreationDate (D:20000101000000+00\'00\')', normalized_content)
+        self.assertIn(b'/ModDate (D:20000101000000Z)', normalized_content)
+        self.assertIn(b'/Creator (MuseScore)', normalized_content)
+
+    def test_preserves_length(self):
+        self.assertEqual(len(self._write_and_normalize(_PDF_CONTENT)), len(_PDF_CONTENT))
+
+    def test_renders_at_different_times_normalize_identically(self):
+        other_pdf_content = _PDF_CONTENT.replace(b'20201010123456+02\'00\'', b'20211111010101-05\'30\'')
+
+        self.assertEqual(self._write_and_normalize(_PDF_CONTENT), self._write_and_normalize(other_pdf_content))
+
+    def test_pdf_without_dates_unchanged(self):
+        pdf_content = b'%PDF-1.4\n1 0 obj\n<< /Creator (MuseScore) >>\nendobj\n'
+
+        self.assertEqual(self._write_and_normalize(pdf_content), pdf_content)
+
+    def _write_and_normalize(self, content):
+        with open(self._pdf_filepath, 'wb') as f:
+            f.write(content)
+        normalize_pdf_dates(self._pdf_filepath)
+        with open(self._pdf_filepath, 'rb') as f:
+            return f.read()
+
+
+if __name__ == '__main__':
+    unittest.main()
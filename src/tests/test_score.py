@@ -107,6 +107,13 @@ class TestScore(unittest.TestCase):
         self.assertFalse(self._multi_part_multi_staves_score.has_manual_parts())
         self.assertTrue(self._multi_part_manual_parts_score.has_manual_parts())
 
+    def test_get_part_names(self):
+        self.assertListEqual(self._single_part_score.get_part_names(), [])
+        self.assertListEqual(self._multi_part_same_name_score.get_part_names(), ['Violin 1', 'Violin 2'])
+        self.assertListEqual(self._multi_part_manual_parts_score.get_part_names(), ['Violin Part', 'Piano'])
+        self.assertListEqual(self._multi_part_global_text_score.get_part_names(),
+                             [p.name for p in self._multi_part_global_text_score.generate_part_scores()])
+
     # Assertion Helpers
     def _assert_nonlinked_score_metadata_correct(self, root, work_title):
         score_xml = find_exactly_one(root, 'Score')
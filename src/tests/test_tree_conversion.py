@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+import time
+import unittest
+
+from musescore.musescore_runner import MuseScore
+from tests.base_test_cases import FakeMuseScoreTestCase
+from tree_conversion import run_tree_conversion
+
+_MANIFEST_FILENAME = '.convert_tree_manifest.jsonl'
+# Manual parts take a single MuseScore run to convert.
+_MULTI_PART_MANUAL_PARTS_PATH = 'test_resources/multi_part_manual_parts.mscz'
+
+
+class TestTreeConversion(FakeMuseScoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self._manifest_filepath = os.path.join(self.tempdir, _MANIFEST_FILENAME)
+
+    def test_skips_files_with_up_to_date_outputs(self):
+        mscz_filepath = self._write_mscz('song')
+        self._run()
+        os.remove(self._manifest_filepath)
+
+        self._run()
+        self.assertListEqual(self._read_manifest_paths(), [])
+
+        future_time = time.time() + 60
+        os.utime(mscz_filepath, (future_time, future_time))
+        self._run()
+        self.assertListEqual(self._read_manifest_paths(), ['song.mscz'])
+
+    def test_resumes_from_manifest_with_truncated_last_line(self):
+        converted_filepath = self._write_mscz('converted')
+        self._write_mscz('interrupted')
+        with open(self._manifest_filepath, 'w') as f:
+            f.write(json.dumps({'path': 'converted.mscz', 'mtime': os.path.getmtime(converted_filepath),
+                                'renders': 1, 'seconds': 1.0}) + '\n')
+            # Killed partway through writing the next entry.
+            f.write('{"path": "interru')
+
+        self._run()
+        self.assertFalse(os.path.exists(os.path.join(self.tempdir, MuseScore.get_score_pdf_filename('converted'))))
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, MuseScore.get_score_pdf_filename('interrupted'))))
+        self.assertListEqual(self._read_manifest_paths(), ['converted.mscz', 'interrupted.mscz'])
+
+    def test_other_songs_outputs_not_taken_as_parts(self):
+        self._write_mscz('Foo')
+        # Foo's score PDF and another song's score PDF, which looks like one of Foo's part PDFs.
+        for filename in [MuseScore.get_score_pdf_filename('Foo'), MuseScore.get_score_pdf_filename('Foo - Bar')]:
+            with open(os.path.join(self.tempdir, filename), 'wb') as f:
+                f.write(b'%PDF-1.4\n')
+
+        self._run()
+        self.assertListEqual(self._read_manifest_paths(), ['Foo.mscz'])
+
+    def test_failed_files_left_out_of_manifest(self):
+        self._write_mscz('good')
+        with open(os.path.join(self.tempdir, 'bad.mscz'), 'wb') as f:
+            f.write(b'not a MuseScore file')
+
+        self._run()
+        self.assertListEqual(self._read_manifest_paths(), ['good.mscz'])
+
+    def _write_mscz(self, song_name):
+        mscz_filepath = os.path.join(self.tempdir, f'{song_name}.mscz')
+        shutil.copy(_MULTI_PART_MANUAL_PARTS_PATH, mscz_filepath)
+        return mscz_filepath
+
+    def _run(self):
+        run_tree_conversion(self.tempdir, num_processes=1)
+
+    # Lines that aren't JSON are partial entries left by a killed run.
+    def _read_manifest_paths(self):
+        paths = []
+        with open(self._manifest_filepath) as f:
+            for line in f:
+                try:
+                    paths.append(json.loads(line)['path'])
+                except json.JSONDecodeError:
+                    pass
+
+        return sorted(paths)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+from collections import namedtuple
+import json
+import multiprocessing
+import os
+import time
+import traceback
+
+from musescore.musescore_runner import MuseScore
+from musescore.pdf_conversion import convert_mscz_to_pdfs
+from musescore.score import Score
+from utils.instrumentation import get_counter
+from utils.os_path_utils import get_no_extension, get_extension
+
+_MUSESCORE_EXTENSIONS = ['.mscz', '.mscx']
+_MANIFEST_FILENAME = '.convert_tree_manifest.jsonl'
+
+
+# Converts every MuseScore file below root_dir next to its source, the same way --mscz-to-convert does for one file.
+# Completed conversions are appended to a manifest in root_dir, so an interrupted run picks up where it left off.
+def run_tree_conversion(root_dir, num_processes):
+    manifest_filepath = os.path.join(root_dir, _MANIFEST_FILENAME)
+    relpath_to_converted_mtime = _load_manifest(manifest_filepath)
+    _end_partial_last_line(manifest_filepath)
+
+    musescore_filepath_to_dir_filenames = _find_musescore_files(root_dir)
+    filepaths_to_convert = [
+        p for p, dir_filenames in musescore_filepath_to_dir_filenames.items()
+        if relpath_to_converted_mtime.get(os.path.relpath(p, root_dir)) != os.path.getmtime(p)
+        and not _are_outputs_up_to_date(p, dir_filenames)]
+    print(f'found {len(musescore_filepath_to_dir_filenames)} MuseScore files, '
+          f'{len(filepaths_to_convert)} need converting')
+
+    stats = _ConversionStats()
+    with open(manifest_filepath, 'a', buffering=1) as manifest_file, \
+            multiprocessing.Pool(num_processes, initializer=_init_worker, initargs=(MuseScore.binary_path,)) as pool:
+        for result in pool.imap_unordered(_convert_file, filepaths_to_convert):
+            stats.add(result)
+            if result.error is not None:
+                print(f'failed to convert {result.filepath}:\n{result.error}')
+            else:
+                manifest_file.write(json.dumps({'path': os.path.relpath(result.filepath, root_dir),
+                                                'mtime': result.mtime,
+                                                'renders': result.num_renders,
+                                                'seconds': result.seconds}) + '\n')
+            print(f'[{stats.num_done()}/{len(filepaths_to_convert)}] {result.filepath} '
+                  f'({result.num_renders} renders, {result.seconds:.1f}s), {stats.get_summary()}')
+
+    print(f'done: {stats.get_summary()}')
+
+
+class _ConversionStats:
+    def __init__(self):
+        self._start_time = time.perf_counter()
+        self._num_converted = 0
+        self._num_failed = 0
+        self._num_renders = 0
+
+    def add(self, result):
+        if result.error is None:
+            self._num_converted += 1
+        else:
+            self._num_failed += 1
+        self._num_renders += result.num_renders
+
+    def num_done(self):
+        return self._num_converted + self._num_failed
+
+    def get_summary(self):
+        elapsed_minutes = (time.perf_counter() - self._start_time) / 60
+        files_per_minute = self.num_done() / elapsed_minutes if elapsed_minutes > 0 else 0
+        renders_per_file = self._num_renders / self.num_done() if self.num_done() > 0 else 0
+        return (f'{self._num_converted} converted, {self._num_failed} failed, {files_per_minute:.1f} files/min, '
+                f'{renders_per_file:.1f} renders/file')
+
+
+def _load_manifest(manifest_filepath):
+    relpath_to_converted_mtime = {}
+    if not os.path.exists(manifest_filepath):
+        return relpath_to_converted_mtime
+
+    with open(manifest_filepath) as f:
+        for line in f:
+            # A run killed mid-write can leave a partial last line behind.
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            relpath_to_converted_mtime[entry['path']] = entry['mtime']
+
+    return relpath_to_converted_mtime
+
+
+# Otherwise the first entry appended would run on from the partial line and be lost along with it.
+def _end_partial_last_line(manifest_filepath):
+    if not os.path.exists(manifest_filepath) or os.path.getsize(manifest_filepath) == 0:
+        return
+
+    with open(manifest_filepath, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
+
+
+# Returns each MuseScore file's path mapped to the filenames in its directory, so each directory is only listed once.
+def _find_musescore_files(root_dir):
+    musescore_filepath_to_dir_filenames = {}
+    for dirpath, _, filenames in os.walk(root_dir):
+        dir_filenames = set(filenames)
+        for filename in sorted(filenames):
+            if get_extension(filename) in _MUSESCORE_EXTENSIONS:
+                musescore_filepath_to_dir_filenames[os.path.join(dirpath, filename)] = dir_filenames
+
+    return musescore_filepath_to_dir_filenames
+
+
+# Mirrors the Drive sync check: outputs are up to date when they're all newer than the MuseScore file. This parses the
+# score for its part names, but only for files the manifest doesn't already cover.
+def _are_outputs_up_to_date(musescore_filepath, dir_filenames):
+    song_dir, song_basename = os.path.split(musescore_filepath)
+    song_name = get_no_extension(song_basename)
+    if MuseScore.get_score_pdf_filename(song_name) not in dir_filenames:
+        return False
+
+    try:
+        part_names = Score.create_from_file(musescore_filepath).get_part_names()
+    except Exception:  # pylint: disable=broad-except
+        # Left for the conversion itself to report.
+        return False
+
+    gen_pdf_filenames = [MuseScore.get_score_pdf_filename(song_name)] + \
+        [MuseScore.get_part_pdf_filename(song_name, p) for p in part_names]
+    if any(f not in dir_filenames for f in gen_pdf_filenames):
+        return False
+
+    return os.path.getmtime(musescore_filepath) < \
+        min(os.path.getmtime(os.path.join(song_dir, f)) for f in gen_pdf_filenames)
+
+
+# MuseScore.binary_path is class state, which isn't carried over to spawned (i.e. Windows) worker processes.
+def _init_worker(musescore_binary_path):
+    MuseScore.binary_path = musescore_binary_path
+
+
+def _convert_file(musescore_filepath):
+    mtime = os.path.getmtime(musescore_filepath)
+    num_renders_before = get_counter('musescore_renders')
+    start_time = time.perf_counter()
+    error = None
+    try:
+        song_dir, song_basename = os.path.split(musescore_filepath)
+        convert_mscz_to_pdfs(
+            mscz_filename=musescore_filepath,
+            output_directory=song_dir,
+            song_name=get_no_extension(song_basename))
+    except Exception:  # pylint: disable=broad-except
+        error = traceback.format_exc()
+
+    return _ConversionResult(filepath=musescore_filepath,
+                             mtime=mtime,
+                             num_renders=get_counter('musescore_renders') - num_renders_before,
+                             seconds=time.perf_counter() - start_time,
+                             error=error)
+
+
+_ConversionResult = namedtuple('_ConversionResult', ['filepath', 'mtime', 'num_renders', 'seconds', 'error'])
@@ -0,0 +1,174 @@
+from dataclasses import dataclass
+import threading
+import time
+import traceback
+
+
+# Dispatches jobs from several roots (e.g. Drive folders) onto a fixed number of worker threads using stride scheduling:
+# each dispatch advances the root's virtual time by 1 / priority, and the active root with the smallest virtual time
+# goes next. A root with twice the priority gets twice the workers under contention, and a burst in one root can't
+# starve the others.
+#
+# Jobs themselves live in a JobQueue, which decides their order within a root and handles retries and the dead-letter
+# list, so queued work survives a restart.
+#
+# Jobs that share a scarcer resource than the workers themselves (e.g. MuseScore processes) can take it from
+# create_slots, which hands it out between roots the same way.
+class FairShareScheduler:
+    # create_worker_context is called once on each worker thread, and run_job(worker_context, job_key) runs a job on it.
+    # This is for per-thread resources like API clients that aren't thread safe.
+    def __init__(self, num_workers, create_worker_context, run_job, job_queue):
+        if num_workers < 1:
+            raise ValueError(f'Need at least 1 worker, got {num_workers}')
+
+        self._condition = threading.Condition()
+        self._roots = {}
+        # The virtual time of the last dispatched root, i.e. how far the roots that have been active have got.
+        self._virtual_time = 0.0
+        self._run_job = run_job
+        self._job_queue = job_queue
+        self._num_workers = num_workers
+        self._create_worker_context = create_worker_context
+        # The root of the job each worker thread is running.
+        self._current_job = threading.local()
+
+    def add_root(self, root_id, priority):
+        if priority <= 0:
+            raise ValueError(f'Priority for root {root_id} must be positive, got {priority}')
+
+        with self._condition:
+            if root_id in self._roots:
+                raise ValueError(f'Root {root_id} already added')
+            self._roots[root_id] = _Root(priority)
+
+    # Separate from construction so roots can be added before workers pick up jobs left over from a previous run.
+    def start(self):
+        for _ in range(self._num_workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def create_slots(self, num_slots):
+        return FairShareSlots(num_slots, self._get_current_root)
+
+    def submit(self, root_id, job_key, priority, revive_dead=True):
+        with self._condition:
+            root = self._roots[root_id]
+            # Idle roots don't bank credit: a root waking up starts level with the roots that kept running meanwhile,
+            # even if none of them have anything pending right now.
+            if root_id not in self._get_ready_root_ids():
+                root.virtual_time = max(root.virtual_time, self._virtual_time)
+            self._job_queue.enqueue(root_id, job_key, priority, revive_dead)
+            self._condition.notify()
+
+    def _work(self):
+        worker_context = self._create_worker_context()
+        while True:
+            with self._condition:
+                root_id, job_key = self._take_next_job()
+                while job_key is None:
+                    self._condition.wait(self._get_seconds_until_next_ready_job())
+                    root_id, job_key = self._take_next_job()
+
+            self._current_job.root_id = root_id
+            try:
+                self._run_job(worker_context, job_key)
+            except Exception:  # pylint: disable=broad-except
+                error = traceback.format_exc()
+                with self._condition:
+                    is_dead = self._job_queue.mark_failed(job_key, error)
+                print(f'job {job_key} failed{", moved to dead-letter list" if is_dead else ", will retry"}:\n{error}')
+            else:
+                with self._condition:
+                    self._job_queue.mark_done(job_key)
+                    # The job may have been re-enqueued while it was running.
+                    self._condition.notify()
+
+    # Returns the root ID and job key, both None if no job is ready. Must be called with _condition held.
+    def _take_next_job(self):
+        ready_root_ids = self._get_ready_root_ids()
+        if len(ready_root_ids) == 0:
+            return None, None
+
+        root_id = _get_next_root_id(ready_root_ids, self._roots)
+        self._virtual_time = self._roots[root_id].virtual_time
+        self._roots[root_id].advance()
+        return root_id, self._job_queue.claim_next(root_id)
+
+    # Returns the root ID and priority of the job running on this thread. Other threads share one root of priority 1.
+    def _get_current_root(self):
+        root_id = getattr(self._current_job, 'root_id', None)
+        if root_id is None:
+            return None, 1
+
+        with self._condition:
+            return root_id, self._roots[root_id].priority
+
+    # Jobs for roots that are no longer configured stay in the queue untouched. Ties in virtual time go to the root
+    # added first.
+    def _get_ready_root_ids(self):
+        queue_ready_root_ids = self._job_queue.get_ready_root_ids()
+        return [r for r in self._roots if r in queue_ready_root_ids]
+
+    # None (i.e. wait until notified) if nothing is pending, otherwise wakes up for the earliest retry.
+    def _get_seconds_until_next_ready_job(self):
+        next_ready_time = self._job_queue.get_next_ready_time(list(self._roots))
+        if next_ready_time is None:
+            return None
+
+        return max(0.0, next_ready_time - time.time())
+
+
+# A counting semaphore for a FairShareScheduler's jobs, see FairShareScheduler.create_slots. A freed slot goes to the
+# waiting root with the smallest virtual time for these slots (ties in the order they started waiting) rather than to
+# whichever job asked first, so that under contention roots get slots in proportion to their priority too.
+class FairShareSlots:
+    # get_current_root returns the root ID and priority that the calling thread acquires slots for.
+    def __init__(self, num_slots, get_current_root):
+        if num_slots < 1:
+            raise ValueError(f'Need at least 1 slot, got {num_slots}')
+
+        self._condition = threading.Condition()
+        self._num_free_slots = num_slots
+        self._get_current_root = get_current_root
+        self._roots = {}
+        # The virtual time of the root that last got a slot.
+        self._virtual_time = 0.0
+        # One root ID per waiting thread, in the order they started waiting.
+        self._waiting_root_ids = []
+
+    def acquire(self):
+        root_id, priority = self._get_current_root()
+        with self._condition:
+            root = self._roots.setdefault(root_id, _Root(priority))
+            # As in FairShareScheduler.submit, a root that wasn't waiting starts level with the roots that kept getting
+            # slots meanwhile, whether or not any of them are waiting now.
+            if root_id not in self._waiting_root_ids:
+                root.virtual_time = max(root.virtual_time, self._virtual_time)
+            self._waiting_root_ids.append(root_id)
+            while self._num_free_slots == 0 or _get_next_root_id(self._waiting_root_ids, self._roots) != root_id:
+                self._condition.wait()
+
+            self._waiting_root_ids.remove(root_id)
+            self._num_free_slots -= 1
+            self._virtual_time = root.virtual_time
+            root.advance()
+            # Another slot may still be free for the next waiting root.
+            self._condition.notify_all()
+
+    def release(self):
+        with self._condition:
+            self._num_free_slots += 1
+            self._condition.notify_all()
+
+
+@dataclass
+class _Root:
+    priority: float
+    virtual_time: float = 0.0
+
+    def advance(self):
+        self.virtual_time += 1 / self.priority
+
+
+# min keeps the first of equal virtual times, so ties go in root_ids order.
+def _get_next_root_id(root_ids, roots):
+    return min(root_ids, key=lambda r: roots[r].virtual_time)
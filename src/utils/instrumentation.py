@@ -0,0 +1,107 @@
+import contextlib
+from collections import defaultdict
+import json
+import threading
+import time
+
+_METRIC_PREFIX = 'musescore_pdf_generator'
+
+# Process-wide instrumentation state. Everything is aggregated in memory so it can be served as Prometheus text, and
+# individual events are optionally streamed to a JSON lines file as they happen.
+_lock = threading.Lock()
+_span_totals = defaultdict(lambda: [0, 0.0])  # span name -> [count, total seconds]
+_value_totals = defaultdict(lambda: [0, 0.0])  # value name -> [count, sum]
+_counters = defaultdict(int)  # (counter name, sorted label items) -> count
+_jsonl_file = None
+
+
+# A filename of None stops writing events.
+def set_jsonl_output(filename):
+    global _jsonl_file  # pylint: disable=global-statement
+    with _lock:
+        if _jsonl_file is not None:
+            _jsonl_file.close()
+        # Line buffered so that a killed daemon still leaves complete lines behind.
+        _jsonl_file = open(filename, 'a', buffering=1) if filename is not None else None
+
+
+@contextlib.contextmanager
+def timed_span(name, **attributes):
+    start_time = time.time()
+    start_counter = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start_counter
+        with _lock:
+            _span_totals[name][0] += 1
+            _span_totals[name][1] += duration
+            _write_event({'type': 'span', 'name': name, 'start': start_time, 'duration': duration, 'error': error,
+                          'attributes': attributes})
+
+
+def record_value(name, value, **attributes):
+    with _lock:
+        _value_totals[name][0] += 1
+        _value_totals[name][1] += value
+        _write_event({'type': 'value', 'name': name, 'time': time.time(), 'value': value, 'attributes': attributes})
+
+
+def increment_counter(name, amount=1, **labels):
+    with _lock:
+        _counters[(name, tuple(sorted(labels.items())))] += amount
+
+
+def get_counter(name, **labels):
+    with _lock:
+        return _counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def get_prometheus_text():
+    lines = []
+    with _lock:
+        for name, (count, total) in sorted(_span_totals.items()):
+            lines.append(f'{_METRIC_PREFIX}_span_seconds_sum{{span="{name}"}} {total}')
+            lines.append(f'{_METRIC_PREFIX}_span_seconds_count{{span="{name}"}} {count}')
+        for name, (count, total) in sorted(_value_totals.items()):
+            lines.append(f'{_METRIC_PREFIX}_{name}_sum {total}')
+            lines.append(f'{_METRIC_PREFIX}_{name}_count {count}')
+        for (name, labels), count in sorted(_counters.items()):
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f'{_METRIC_PREFIX}_{name}_total{{{label_text}}} {count}')
+
+    return '\n'.join(lines) + '\n'
+
+
+# Serves get_prometheus_text() on localhost from a daemon thread, so it never keeps the process alive on its own.
+# http.server is imported here rather than at the top, as it costs more startup time than the server is worth when
+# metrics aren't served.
+def start_prometheus_server(port):
+    import http.server  # pylint: disable=import-outside-toplevel
+
+    class PrometheusRequestHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = get_prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        # Scrapes would otherwise spam stderr.
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), PrometheusRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Must be called with _lock held.
+def _write_event(event):
+    if _jsonl_file is not None:
+        _jsonl_file.write(json.dumps(event, default=str) + '\n')
@@ -0,0 +1,135 @@
+from collections import namedtuple
+import sqlite3
+import time
+
+# Lower runs first.
+PRIORITY_CHANGED = 0
+PRIORITY_BULK = 1
+
+_PENDING = 'pending'
+_RUNNING = 'running'
+_DONE = 'done'
+_DEAD = 'dead'
+
+
+# Durable job queue backed by SQLite, with at most one row per job key. A job moves pending -> running -> done, or back
+# to pending with exponential backoff when it fails, until it runs out of attempts and moves to dead (the dead-letter
+# list). Jobs left running by a crashed process are pending again when the queue is reopened.
+#
+# Not thread safe on its own: callers share one JobQueue behind their own lock.
+class JobQueue:
+    def __init__(self, db_filepath, max_attempts=5, retry_backoff_seconds=30):
+        self._max_attempts = max_attempts
+        self._retry_backoff_seconds = retry_backoff_seconds
+        # Autocommit, so every state change is on disk before the caller acts on it.
+        self._connection = sqlite3.connect(db_filepath, isolation_level=None, check_same_thread=False)
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_key TEXT PRIMARY KEY,
+                root_id TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                rerun INTEGER NOT NULL,
+                ready_time REAL NOT NULL,
+                enqueued_time REAL NOT NULL,
+                last_error TEXT
+            )''')
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, root_id, priority, ready_time)')
+        self._connection.execute('UPDATE jobs SET status = ? WHERE status = ?', (_PENDING, _RUNNING))
+
+    # Re-enqueueing a pending job only raises its priority, and re-enqueueing a running job makes it run once more after
+    # it finishes. Dead jobs are only revived if revive_dead is set, so that periodic bulk regeneration doesn't keep
+    # retrying a file that's known to be broken. For the same reason, only then does a pending job waiting out a retry
+    # get a fresh set of attempts and run right away, as the new change may well fix what made it fail.
+    def enqueue(self, root_id, job_key, priority, revive_dead=True):
+        row = self._connection.execute('SELECT status FROM jobs WHERE job_key = ?', (job_key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self._connection.execute(
+                'INSERT INTO jobs (job_key, root_id, priority, status, attempts, rerun, ready_time, enqueued_time) '
+                'VALUES (?, ?, ?, ?, 0, 0, ?, ?)',
+                (job_key, root_id, priority, _PENDING, now, now))
+            return
+
+        [status] = row
+        if status == _PENDING and revive_dead:
+            self._connection.execute('UPDATE jobs SET root_id = ?, priority = MIN(priority, ?), attempts = 0, '
+                                     'ready_time = MIN(ready_time, ?) WHERE job_key = ?',
+                                     (root_id, priority, now, job_key))
+        elif status == _PENDING:
+            self._connection.execute('UPDATE jobs SET root_id = ?, priority = MIN(priority, ?) WHERE job_key = ?',
+                                     (root_id, priority, job_key))
+        elif status == _RUNNING:
+            self._connection.execute('UPDATE jobs SET root_id = ?, priority = ?, rerun = 1 WHERE job_key = ?',
+                                     (root_id, priority, job_key))
+        elif status == _DONE or revive_dead:
+            self._connection.execute(
+                'UPDATE jobs SET root_id = ?, priority = ?, status = ?, attempts = 0, rerun = 0, ready_time = ?, '
+                'enqueued_time = ?, last_error = NULL WHERE job_key = ?',
+                (root_id, priority, _PENDING, now, now, job_key))
+
+    def get_ready_root_ids(self):
+        rows = self._connection.execute('SELECT DISTINCT root_id FROM jobs WHERE status = ? AND ready_time <= ?',
+                                        (_PENDING, time.time()))
+        return {root_id for [root_id] in rows}
+
+    # Returns None if none of root_ids have pending jobs.
+    def get_next_ready_time(self, root_ids):
+        root_id_placeholders = ', '.join('?' for _ in root_ids)
+        [next_ready_time] = self._connection.execute(
+            f'SELECT MIN(ready_time) FROM jobs WHERE status = ? AND root_id IN ({root_id_placeholders})',
+            [_PENDING] + root_ids).fetchone()
+        return next_ready_time
+
+    # Marks and returns the most urgent ready job key for root_id, or None if it has none.
+    def claim_next(self, root_id):
+        row = self._connection.execute(
+            'SELECT job_key FROM jobs WHERE status = ? AND root_id = ? AND ready_time <= ? '
+            'ORDER BY priority, enqueued_time, rowid LIMIT 1',
+            (_PENDING, root_id, time.time())).fetchone()
+        if row is None:
+            return None
+
+        [job_key] = row
+        self._connection.execute('UPDATE jobs SET status = ?, rerun = 0 WHERE job_key = ?', (_RUNNING, job_key))
+        return job_key
+
+    def mark_done(self, job_key):
+        [rerun] = self._connection.execute('SELECT rerun FROM jobs WHERE job_key = ?', (job_key,)).fetchone()
+        if rerun:
+            self._connection.execute('UPDATE jobs SET status = ?, attempts = 0, rerun = 0, ready_time = ? '
+                                     'WHERE job_key = ?', (_PENDING, time.time(), job_key))
+        else:
+            self._connection.execute('UPDATE jobs SET status = ?, last_error = NULL WHERE job_key = ?',
+                                     (_DONE, job_key))
+
+    # Returns whether the job was moved to the dead-letter list. A job re-enqueued while it was running gets a fresh set
+    # of attempts instead, since the failure may well have been in the content it's been re-enqueued for.
+    def mark_failed(self, job_key, error):
+        [attempts, rerun] = self._connection.execute('SELECT attempts, rerun FROM jobs WHERE job_key = ?',
+                                                     (job_key,)).fetchone()
+        if rerun:
+            self._connection.execute('UPDATE jobs SET status = ?, attempts = 0, rerun = 0, ready_time = ?, '
+                                     'last_error = ? WHERE job_key = ?', (_PENDING, time.time(), error, job_key))
+            return False
+
+        attempts += 1
+        if attempts >= self._max_attempts:
+            self._connection.execute('UPDATE jobs SET status = ?, attempts = ?, rerun = 0, last_error = ? '
+                                     'WHERE job_key = ?', (_DEAD, attempts, error, job_key))
+            return True
+
+        ready_time = time.time() + self._retry_backoff_seconds * 2 ** (attempts - 1)
+        self._connection.execute('UPDATE jobs SET status = ?, attempts = ?, rerun = 0, ready_time = ?, last_error = ? '
+                                 'WHERE job_key = ?', (_PENDING, attempts, ready_time, error, job_key))
+        return False
+
+    def get_dead_jobs(self):
+        rows = self._connection.execute('SELECT job_key, root_id, attempts, last_error FROM jobs WHERE status = ? '
+                                        'ORDER BY job_key', (_DEAD,))
+        return [DeadJob(*row) for row in rows]
+
+
+DeadJob = namedtuple('DeadJob', ['job_key', 'root_id', 'attempts', 'last_error'])
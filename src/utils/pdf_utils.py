@@ -0,0 +1,31 @@
+import re
+
+# e.g. /CreationDate (D:20200714123456+02'00')
+_PDF_DATE_REGEX = re.compile(rb'(/(?:CreationDate|ModDate)\s*\(D:)([^)]*)\)')
+_NORMALIZED_DATE_DIGITS = b'20000101000000'
+
+
+# MuseScore stamps the render time into every PDF, so re-rendering an unchanged score never produces the same bytes.
+# This overwrites those dates with a fixed date of the same length, which leaves the PDF's byte offsets (and therefore
+# its cross reference table) valid.
+def normalize_pdf_dates(pdf_filepath):
+    with open(pdf_filepath, 'rb') as f:
+        content = f.read()
+
+    normalized_content = _PDF_DATE_REGEX.sub(_normalize_date_match, content)
+    if normalized_content != content:
+        with open(pdf_filepath, 'wb') as f:
+            f.write(normalized_content)
+
+
+def _normalize_date_match(match):
+    date_prefix, date = match.groups()
+    normalized_date = bytearray(date)
+    digit_indices = [i for i, c in enumerate(normalized_date) if chr(c).isdigit()]
+    for digit_index, i in enumerate(digit_indices):
+        normalized_date[i] = _NORMALIZED_DATE_DIGITS[digit_index] if digit_index < len(_NORMALIZED_DATE_DIGITS) \
+            else ord('0')
+    # Time zones west of UTC have a negative offset, so the offset's sign is normalized too.
+    normalized_date = normalized_date.replace(b'-', b'+')
+
+    return date_prefix + bytes(normalized_date) + b')'